@@ -247,10 +247,10 @@ class Ui_MainWindow(object):
 "}\n"
 "\n"
 "/***************\n"
-"         QTableWidget \n"
+"         QTableView \n"
 "********************************/\n"
 "\n"
-"QTableWidget {\n"
+"QTableView {\n"
 "    background-color: transparent;\n"
 "    selection-color: #434343;\n"
 "    color: #eeeeee;\n"
@@ -259,7 +259,7 @@ class Ui_MainWindow(object):
 "    font: 12pt \"Droid Sans Fallback\";\n"
 "}\n"
 "\n"
-"QTableWidget::item {\n"
+"QTableView::item {\n"
 "    color: #eeeeee;\n"
 "    padding: 6 0 6 -10;\n"
 "    padding-left: 5px;\n"
@@ -267,7 +267,7 @@ class Ui_MainWindow(object):
 "    background-color: transparent;\n"
 "}\n"
 "\n"
-"QTableWidget::item:selected {\n"
+"QTableView::item:selected {\n"
 "    background-color: #3d3d3d;\n"
 "}\n"
 "\n"
@@ -605,49 +605,29 @@ class Ui_MainWindow(object):
         self.processByUser.addItem("")
         self.gridLayout.addWidget(self.processByUser, 4, 2, 1, 1)
         self.verticalLayout_4.addWidget(self.frame)
-        self.processTableWidget = QtWidgets.QTableWidget(self.processPage)
-        self.processTableWidget.setFrameShape(QtWidgets.QFrame.NoFrame)
-        self.processTableWidget.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
-        self.processTableWidget.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
-        self.processTableWidget.setObjectName("processTableWidget")
-        self.processTableWidget.setColumnCount(3)
-        self.processTableWidget.setRowCount(6)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setVerticalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setVerticalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setVerticalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setVerticalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setVerticalHeaderItem(4, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setVerticalHeaderItem(5, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setItem(0, 0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setItem(0, 1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setItem(0, 2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setItem(1, 0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setItem(1, 1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.processTableWidget.setItem(1, 2, item)
-        self.processTableWidget.horizontalHeader().setDefaultSectionSize(150)
-        self.processTableWidget.horizontalHeader().setHighlightSections(False)
-        self.processTableWidget.horizontalHeader().setStretchLastSection(True)
-        self.processTableWidget.verticalHeader().setVisible(False)
-        self.processTableWidget.verticalHeader().setHighlightSections(False)
-        self.verticalLayout_4.addWidget(self.processTableWidget)
+        self.processTableView = QtWidgets.QTableView(self.processPage)
+        self.processTableView.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.processTableView.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.processTableView.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.processTableView.setSortingEnabled(True)
+        self.processTableView.setObjectName("processTableView")
+        self.processTableView.horizontalHeader().setDefaultSectionSize(150)
+        self.processTableView.horizontalHeader().setHighlightSections(False)
+        self.processTableView.horizontalHeader().setStretchLastSection(True)
+        self.processTableView.verticalHeader().setVisible(False)
+        self.processTableView.verticalHeader().setHighlightSections(False)
+        self.verticalLayout_4.addWidget(self.processTableView)
+        self.connectionsTableView = QtWidgets.QTableView(self.processPage)
+        self.connectionsTableView.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.connectionsTableView.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.connectionsTableView.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.connectionsTableView.setObjectName("connectionsTableView")
+        self.connectionsTableView.horizontalHeader().setDefaultSectionSize(150)
+        self.connectionsTableView.horizontalHeader().setHighlightSections(False)
+        self.connectionsTableView.horizontalHeader().setStretchLastSection(True)
+        self.connectionsTableView.verticalHeader().setVisible(False)
+        self.connectionsTableView.verticalHeader().setHighlightSections(False)
+        self.verticalLayout_4.addWidget(self.connectionsTableView)
         self.containerStackedWidget.addWidget(self.processPage)
         self.servicePage = QtWidgets.QWidget()
         self.servicePage.setObjectName("servicePage")
@@ -816,40 +796,6 @@ class Ui_MainWindow(object):
         self.processByUser.setItemText(1, _translate("MainWindow", "New Item"))
         self.processByUser.setItemText(2, _translate("MainWindow", "New Item"))
         self.processByUser.setItemText(3, _translate("MainWindow", "New Item"))
-        self.processTableWidget.setSortingEnabled(True)
-        item = self.processTableWidget.verticalHeaderItem(0)
-        item.setText(_translate("MainWindow", "New Row"))
-        item = self.processTableWidget.verticalHeaderItem(1)
-        item.setText(_translate("MainWindow", "New Row"))
-        item = self.processTableWidget.verticalHeaderItem(2)
-        item.setText(_translate("MainWindow", "New Row"))
-        item = self.processTableWidget.verticalHeaderItem(3)
-        item.setText(_translate("MainWindow", "New Row"))
-        item = self.processTableWidget.verticalHeaderItem(4)
-        item.setText(_translate("MainWindow", "New Row"))
-        item = self.processTableWidget.verticalHeaderItem(5)
-        item.setText(_translate("MainWindow", "New Row"))
-        item = self.processTableWidget.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "PID"))
-        item = self.processTableWidget.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "NAM"))
-        item = self.processTableWidget.horizontalHeaderItem(2)
-        item.setText(_translate("MainWindow", "STATUS"))
-        __sortingEnabled = self.processTableWidget.isSortingEnabled()
-        self.processTableWidget.setSortingEnabled(False)
-        item = self.processTableWidget.item(0, 0)
-        item.setText(_translate("MainWindow", "python"))
-        item = self.processTableWidget.item(0, 1)
-        item.setText(_translate("MainWindow", "python"))
-        item = self.processTableWidget.item(0, 2)
-        item.setText(_translate("MainWindow", "runing"))
-        item = self.processTableWidget.item(1, 0)
-        item.setText(_translate("MainWindow", "firefox"))
-        item = self.processTableWidget.item(1, 1)
-        item.setText(_translate("MainWindow", "firefox"))
-        item = self.processTableWidget.item(1, 2)
-        item.setText(_translate("MainWindow", "runing"))
-        self.processTableWidget.setSortingEnabled(__sortingEnabled)
         self.labelTitle.setText(_translate("MainWindow", "Details"))
         self.buttonTerminate.setToolTip(_translate("MainWindow", "Terminate "))
         self.buttonTerminate.setStatusTip(_translate("MainWindow", "Terminate "))
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from PyQt5 import QtWidgets, QtGui
+from PyQt5 import QtCore, QtWidgets, QtGui
 from headers.h_interface import Ui_MainWindow
 import config
-from utils import ProcessManager, display_table_records, populate_comboBox
+from models import ConnectionsTableModel, ProcessFilterProxyModel, ProcessTableModel
+from snapshot import PENDING, SnapshotDelta
+from utils import ProcessDetails, ProcessManager, get_column_value, populate_comboBox
+from workers import ProcessCollector, RefreshScheduler
 
 
 class Interface(QtWidgets.QMainWindow):
@@ -21,21 +24,68 @@ class Interface(QtWidgets.QMainWindow):
         self.font.setFamily("Technology")
         config.interface_icons(self)
 
-        # Instantiate ProcessManager
-        self.process_manager = ProcessManager()
+        # Instantiate ProcessManager, queried off the GUI thread through the collector;
+        # executables are only read for the rows around the viewport
+        self.process_manager = ProcessManager(lazy_columns=('exe',))
+        self.collector = ProcessCollector(self.process_manager)
+        self.collector.finished.connect(self.on_collected)
+
+        # Process table model, updated in place from snapshot deltas and filtered in memory
+        self.process_model = ProcessTableModel(['PID', 'NAME', 'STATUS', 'USER', 'EXECUTABLE'], self)
+        self.process_proxy = ProcessFilterProxyModel(self)
+        self.process_proxy.setSourceModel(self.process_model)
+        self.ui.processTableView.setModel(self.process_proxy)
+
+        # Connections of one process, shown in their own view so the process table stays intact
+        self.connections_model = ConnectionsTableModel(
+            ['FD', 'Family', 'Type', 'Local Address', 'Remote Address', 'Status'], self
+        )
+        self.ui.connectionsTableView.setModel(self.connections_model)
+        self.ui.connectionsTableView.hide()
+
+        # Load lazy columns for the visible rows once scrolling or model changes settle
+        self.loading_pids = set()
+        self.viewport_timer = QtCore.QTimer(self)
+        self.viewport_timer.setSingleShot(True)
+        self.viewport_timer.setInterval(50)
+        self.viewport_timer.timeout.connect(self.load_visible_rows)
+        self.ui.processTableView.verticalScrollBar().valueChanged.connect(lambda *args: self.viewport_timer.start())
+        for signal in (self.process_proxy.modelReset, self.process_proxy.layoutChanged, self.process_proxy.rowsInserted):
+            signal.connect(lambda *args: self.viewport_timer.start())
+
+        # Search as you type, once typing pauses
+        self.search_debounce = QtCore.QTimer(self)
+        self.search_debounce.setSingleShot(True)
+        self.search_debounce.setInterval(150)
+        self.search_debounce.timeout.connect(self.search_process)
+
+        # Periodic refresh of the process list, its interval adapted after every scan
+        self.scheduler = RefreshScheduler()
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.refresh_processes)
 
         # Display username
         username = self.get_current_user()
         self.ui.buttonUsername.setText(username)
 
         # Connect UI elements to callbacks
-        self.ui.processTableWidget.itemDoubleClicked.connect(self.process_details)
+        self.ui.processTableView.doubleClicked.connect(self.process_details)
         self.ui.lineEditSearch.returnPressed.connect(self.search_process)
+        self.ui.lineEditSearch.textChanged.connect(lambda _text: self.search_debounce.start())
         self.ui.processByUser.currentIndexChanged.connect(self.process_by_user)
 
-        # Configure and hide dock widget
+        # Configure and hide dock widget, its field labels are built once and reused
         self.ui.dockWidget.setTitleBarWidget(QtWidgets.QWidget())
         self.ui.dockWidget.close()
+        self.detail_labels = {}
+        for key in ProcessDetails.LABELS:
+            self.add_detail_row(key)
+
+        # Live refresh of the open process details
+        self.details_timer = QtCore.QTimer(self)
+        self.details_timer.setInterval(1000)
+        self.details_timer.timeout.connect(self.refresh_process_details)
 
         # Initialize application
         self.goto_process_page()
@@ -53,85 +103,192 @@ class Interface(QtWidgets.QMainWindow):
         self.ui.buttonProcess.setChecked(current_page == 0)
         self.ui.buttonService.setChecked(current_page == 1)
 
-    def update_count_label(self, rows):
-        """Update the process count label."""
-        self.ui.labelProcessCount.setText(f"Total Process ({len(rows)})")
+    def update_count_label(self):
+        """Update the process count label with the number of rows passing the filters."""
+        self.ui.labelProcessCount.setText(f"Total Process ({self.process_proxy.rowCount()})")
+
+    def on_collected(self, callback, result):
+        """Hand a collector result to the callback that requested it, on the GUI thread."""
+        callback(result)
 
     def goto_process_page(self):
         """Switch to the process page and display all processes."""
-        users = ['All'] + list({process[3] for process in self.process_manager.get_all_processes() if process[3]})
+        self.show_process_table()
+        # one fresh scan feeds both the user combobox and the table
+        self.collector.submit(self.show_process_page, 'snapshot', True)
+
+    def show_process_page(self, processes):
+        """Fill the user combobox and the table from a fresh snapshot."""
+        users = ['All'] + list({process[3] for process in processes if process[3]})
         populate_comboBox(self.ui.processByUser, users)
-        self.all_process()
+        self.ui.lineEditSearch.clear()
+        self.process_proxy.set_filters()
+        self.display_process(processes)
 
     def display_process(self, rows):
-        """Display processes in the process table widget."""
-        headers = ['PID', 'NAME', 'STATUS', 'USER', 'EXECUTABLE']
-        display_table_records(self.ui.processTableWidget, rows, headers)
-        self.update_count_label(rows)
+        """Display processes in the process table view."""
+        self.process_model.set_snapshot(rows)
+        self.update_count_label()
         self.pagebuttons_stats()
+        self.schedule_refresh(rows)
 
-    def all_process(self):
-        """Display all processes."""
-        processes = self.process_manager.get_all_processes()
-        self.display_process(processes)
+    def schedule_refresh(self, processes):
+        """Plan the next refresh from the cost and churn of the scan that produced processes."""
+        if getattr(processes, 'delta', None) is None:
+            return
+        churn = len(processes.delta.added) + len(processes.delta.removed)
+        interval = self.scheduler.next_interval(processes.scan_cpu_seconds, churn, len(processes))
+        self.refresh_timer.start(int(interval * 1000))
+
+    def load_visible_rows(self, prefetch_pages: int = 1):
+        """
+        Request the lazy columns of the rows in the viewport, plus prefetch_pages pages above and below.
+        """
+        view, proxy = self.ui.processTableView, self.process_proxy
+        count = proxy.rowCount()
+        first = view.rowAt(0)
+        if first < 0 or not count:
+            return
+        last = view.rowAt(view.viewport().height() - 1)
+        if last < 0:
+            last = count - 1
+        margin = (last - first + 1) * prefetch_pages
+        pids = []
+        for proxy_row in range(max(0, first - margin), min(count, last + margin + 1)):
+            row = self.process_model.row(proxy.mapToSource(proxy.index(proxy_row, 0)).row())
+            if row[0] not in self.loading_pids and any(value is PENDING for value in row[3:]):
+                pids.append(row[0])
+        if pids:
+            self.loading_pids.update(pids)
+            self.collector.submit(lambda rows: self.apply_loaded_rows(pids, rows), 'load_columns', pids)
+
+    def apply_loaded_rows(self, pids, rows):
+        """Show rows whose lazy columns were just read."""
+        self.loading_pids.difference_update(pids)
+        self.process_model.apply_delta(SnapshotDelta(changed=rows))
+
+    def show_process_table(self):
+        """Bring the process table back in place of the connections view."""
+        self.ui.connectionsTableView.hide()
+        self.ui.processTableView.show()
+
+    def refresh_processes(self):
+        """Rescan in the background and apply the changes to the shown tables."""
+        # fallback in case the scan fails; apply_refresh reschedules with the adapted interval
+        self.refresh_timer.start(int(self.scheduler.max_interval * 1000))
+        self.collector.submit(self.apply_refresh, 'snapshot', True)
+        if self.ui.connectionsTableView.isVisible():
+            pid = self.connections_model.pid
+            self.collector.submit(
+                lambda rows: self.apply_connections_refresh(pid, rows), 'get_process_connections', pid
+            )
+
+    def apply_refresh(self, processes):
+        """Apply a refreshed snapshot; the process model is kept current even while hidden."""
+        self.process_model.set_snapshot(processes)
+        self.update_count_label()
+        self.schedule_refresh(processes)
+
+    def apply_connections_refresh(self, pid, rows):
+        """Apply refreshed connections unless another process was opened meanwhile."""
+        if pid == self.connections_model.pid:
+            self.connections_model.update_rows(rows)
 
     def search_process(self):
-        """Search and display processes by name."""
+        """Filter the shown processes by name, in memory."""
+        self.search_debounce.stop()
         p_name = self.ui.lineEditSearch.text()
-        processes = self.process_manager.get_process_by_name(p_name)
-        if processes:
-            self.display_process(processes)
-        else:
+        self.show_filtered(name=p_name)
+        if p_name and not self.process_proxy.rowCount():
             self.ui.labelError.setText(f"No process with name '{p_name}'")
 
     def process_by_user(self):
-        """Filter processes by the selected user."""
+        """Filter the shown processes by the selected user, in memory."""
         username = self.ui.processByUser.currentText()
-        if username == 'All':
-            processes = self.process_manager.get_all_processes()
-        else:
-            processes = self.process_manager.get_process_by_user(username)
-
-        if processes:
-            # display in table widget
-            self.display_process(processes)
-        else:
+        self.show_filtered(user=None if username == 'All' else username)
+        if username != 'All' and not self.process_proxy.rowCount():
             self.ui.labelError.setText(f"No processes owned by '{username}'")
 
+    def show_filtered(self, **filters):
+        """Update some of the proxy filters and bring the process table back if needed."""
+        self.ui.labelError.clear()
+        if 'name' in filters:
+            self.process_proxy.set_name(filters['name'])
+        if 'user' in filters:
+            self.process_proxy.set_user(filters['user'])
+        self.show_process_table()
+        self.update_count_label()
+
     def process_details(self):
-        """Show details for a selected process."""
+        """Request details for the selected process; apply_details_refresh shows them."""
         try:
             self.pid = int(self.get_selected_pid())
-            details = self.process_manager.get_process_details(self.pid)
-
-            if details == "Permission Error":
-                self.ui.labelError.setText("You must have root permissions.")
-                self.ui.dockWidget.close()
-                return
-
-            self.ui.labelError.clear()
-            self.clear_details_form(self.ui.formLayout)
-            for count, (key, value) in enumerate(details.items(), start=1):
-                key_label = self.create_label(self.ui.scrollAreaWidgetContents, f"key_{key}")
-                key_label.setText(key)
-
-                value_label = self.create_label(self.ui.scrollAreaWidgetContents, f"value_{count}")
-                value_label.setText(str(value))
-
-                self.ui.formLayout.setWidget(count, QtWidgets.QFormLayout.LabelRole, key_label)
-                self.ui.formLayout.setWidget(count, QtWidgets.QFormLayout.FieldRole, value_label)
-
-            self.ui.dockWidget.show()
         except ValueError:
             self.ui.labelError.setText("Invalid PID selected.")
+            return
+        pid = self.pid
+        # fetch_details skips a process that exited, which apply_details_refresh reports
+        self.collector.submit(lambda details: self.apply_details_refresh(pid, details), 'fetch_details', [pid])
+
+    def show_process_details(self, details):
+        """Fill the details dock with the fetched process details."""
+        if details == "Permission Error":
+            self.ui.labelError.setText("You must have root permissions.")
+            self.ui.dockWidget.close()
+            self.details_timer.stop()
+            return
+
+        self.ui.labelError.clear()
+        for key, value in details.items():
+            label = self.detail_labels.get(key) or self.add_detail_row(key)
+            label.setText(str(value))
+
+        self.ui.dockWidget.show()
+        self.details_timer.start()
+
+    def refresh_process_details(self):
+        """Re-fetch the details of the open process while the dock is visible."""
+        if not self.ui.dockWidget.isVisible():
+            self.details_timer.stop()
+            return
+        pid = self.pid
+        self.collector.submit(lambda details: self.apply_details_refresh(pid, details), 'fetch_details', [pid])
+
+    def apply_details_refresh(self, pid, details):
+        """Update the dock from a refresh, unless another process was opened meanwhile."""
+        if pid != self.pid:
+            return
+        if not details:
+            self.ui.labelError.setText(f"Process {pid} has exited.")
+            self.details_timer.stop()
+        elif details[0].denied:
+            self.show_process_details("Permission Error")
+        else:
+            self.show_process_details(details[0].as_dict())
+
+    def add_detail_row(self, key):
+        """Append a key/value row to the details form and return its value label."""
+        row = self.ui.formLayout.rowCount()
+        key_label = self.create_label(self.ui.scrollAreaWidgetContents, f"key_{key}")
+        key_label.setText(key)
+        value_label = self.create_label(self.ui.scrollAreaWidgetContents, f"value_{row}")
+        self.ui.formLayout.setWidget(row, QtWidgets.QFormLayout.LabelRole, key_label)
+        self.ui.formLayout.setWidget(row, QtWidgets.QFormLayout.FieldRole, value_label)
+        self.detail_labels[key] = value_label
+        return value_label
 
     def process_more_details(self):
         """
         This will display a new dialog with all information about a process
         """
-        headers = ['FD', 'Family', 'Type', 'Local Address', 'Remote Address', 'Status']
-        rows = self.process_manager.get_process_connections(self.pid)
-        display_table_records(self.ui.processTableWidget, rows, headers)
+        pid = self.pid
+        self.collector.submit(lambda rows: self.show_connections(pid, rows), 'get_process_connections', pid)
+
+    def show_connections(self, pid, rows):
+        """Show the connections of a process in place of the process table."""
+        self.connections_model.set_rows(rows, pid)
+        self.ui.processTableView.hide()
+        self.ui.connectionsTableView.show()
 
     def handle_process(self, action):
         """Handle process actions (terminate, suspend, resume)."""
@@ -139,7 +296,7 @@ class Interface(QtWidgets.QMainWindow):
 
     def get_selected_pid(self):
         """Retrieve the PID of the selected row in the table."""
-        return self.ui.processTableWidget.item(self.ui.processTableWidget.currentRow(), 0).text()
+        return get_column_value(self.ui.processTableView, 0)
 
     @staticmethod
     def create_label(parent, label_name):
@@ -154,13 +311,11 @@ class Interface(QtWidgets.QMainWindow):
         )
         return label
 
-    @staticmethod
-    def clear_details_form(form_layout):
-        """Clear all widgets from a QFormLayout."""
-        while form_layout.count():
-            item = form_layout.takeAt(0)
-            if widget := item.widget():
-                widget.deleteLater()
+    def closeEvent(self, event):
+        """Stop the collector and collection threads before the window goes away."""
+        self.collector.stop()
+        self.process_manager.close()
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left, bisect_right
+from PyQt5 import QtCore
+from snapshot import NameIndex
+
+
+class RowsTableModel(QtCore.QAbstractTableModel):
+    """
+    Read-only table model over a sequence of row tuples (a list or a ProcessSnapshot).
+
+    Cells are formatted in data(), so only the cells a view actually paints are ever
+    converted to strings.
+    """
+
+    def __init__(self, headers: list, parent=None):
+        """
+        :param headers: A list of column headers.
+        :param parent: Optional parent QObject.
+        """
+        super().__init__(parent)
+        self.headers = list(headers)
+        self._rows = []
+
+    def set_rows(self, rows):
+        """
+        Replace the rows served by the model.
+
+        :param rows: A sequence of rows where each row is a list or tuple of values.
+        """
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def row(self, row: int):
+        """
+        Get the row tuple shown at a view row.
+
+        :param row: Row number in the model.
+        """
+        return self._rows[row]
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return str(self.row(index.row())[index.column()])
+        if role == QtCore.Qt.UserRole:
+            return self.row(index.row())[index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return None
+
+
+class ProcessTableModel(RowsTableModel):
+    """
+    Process table model that follows ProcessManager snapshots incrementally.
+
+    Consecutive snapshots are applied as row insertions, removals and cell changes, so
+    the view keeps its selection and scroll position and only repaints what changed.
+    Rows are kept in display order with a parallel list of unique (value, pid) sort keys.
+    """
+
+    def __init__(self, headers: list, parent=None):
+        super().__init__(headers, parent)
+        self._keys = []
+        self._by_pid = {}
+        self._sort = (0, False)
+        self.name_index = NameIndex()
+        # generation of the snapshot shown, None when showing something else (e.g. a filtered subset)
+        self.generation = None
+
+    def set_snapshot(self, snapshot):
+        """
+        Show a snapshot, applying its delta when it directly follows the one shown.
+
+        :param snapshot: A ProcessSnapshot from ProcessManager, or any sequence of rows.
+        """
+        generation = getattr(snapshot, 'generation', None)
+        if generation is not None and self.generation is not None and generation == self.generation + 1:
+            self.apply_delta(snapshot.delta)
+        else:
+            self.set_rows(snapshot)
+        self.generation = generation
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._by_pid = {row[0]: row for row in self._rows}
+        self.name_index = NameIndex.from_rows(self._rows)
+        self._reorder()
+        self.generation = None
+        self.endResetModel()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        # keep selections and the current index on the same processes
+        persistent = [(index, self.row(index.row())[0]) for index in self.persistentIndexList()]
+        self._sort = (column, order == QtCore.Qt.DescendingOrder)
+        self._reorder()
+        positions = {row[0]: position for position, row in enumerate(self._rows)}
+        for index, pid in persistent:
+            self.changePersistentIndex(index, self.index(self._view_row(positions[pid]), index.column()))
+        self.layoutChanged.emit()
+
+    def row(self, row: int):
+        return self._rows[self._internal(row)]
+
+    def view_row(self, pid: int):
+        """
+        Get the row a process is shown at.
+
+        :param pid: Process ID.
+        :return: The row number, or None if the process is not shown.
+        """
+        row = self._by_pid.get(pid)
+        if row is None:
+            return None
+        return self._view_row(bisect_left(self._keys, self._key(row)))
+
+    def apply_delta(self, delta):
+        """
+        Apply a SnapshotDelta with fine-grained model signals.
+
+        :param delta: The delta between the snapshot shown and the next one.
+        """
+        for row in delta.removed:
+            self._remove(row)
+        for row in delta.changed:
+            old = self._by_pid.get(row[0])
+            if old is None:
+                continue
+            if self._key(old) != self._key(row):
+                # the sort column changed, move the row to its new place
+                self._remove(old)
+                self._insert(row)
+                continue
+            position = bisect_left(self._keys, self._key(old))
+            self._rows[position] = self._by_pid[row[0]] = row
+            if old[1] != row[1]:
+                self.name_index.remove(old[0], old[1])
+                self.name_index.add(row[0], row[1])
+            columns = [col for col, (a, b) in enumerate(zip(old, row)) if a != b]
+            if columns:
+                view_row = self._view_row(position)
+                self.dataChanged.emit(self.index(view_row, min(columns)), self.index(view_row, max(columns)))
+        for row in delta.added:
+            self._insert(row)
+
+    def _key(self, row):
+        return _sort_key(row[self._sort[0]]), row[0]
+
+    def _reorder(self):
+        self._rows.sort(key=self._key)
+        self._keys = [self._key(row) for row in self._rows]
+
+    def _internal(self, view_row: int):
+        return len(self._rows) - 1 - view_row if self._sort[1] else view_row
+
+    def _view_row(self, position: int):
+        return len(self._rows) - 1 - position if self._sort[1] else position
+
+    def _remove(self, row):
+        key = self._key(row)
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return
+        view_row = self._view_row(position)
+        self.beginRemoveRows(QtCore.QModelIndex(), view_row, view_row)
+        del self._rows[position]
+        del self._keys[position]
+        del self._by_pid[row[0]]
+        self.name_index.remove(row[0], row[1])
+        self.endRemoveRows()
+
+    def _insert(self, row):
+        key = self._key(row)
+        position = bisect_left(self._keys, key)
+        # in descending order the view row counts from the end of the list
+        view_row = len(self._rows) - position if self._sort[1] else position
+        self.beginInsertRows(QtCore.QModelIndex(), view_row, view_row)
+        self._rows.insert(position, row)
+        self._keys.insert(position, key)
+        self._by_pid[row[0]] = row
+        self.name_index.add(row[0], row[1])
+        self.endInsertRows()
+
+
+def _sort_key(value):
+    """Order numbers numerically, everything else as text, and None last."""
+    if value is None:
+        return 2, ''
+    if isinstance(value, (int, float)):
+        return 0, value
+    return 1, str(value)
+
+
+class ProcessFilterProxyModel(QtCore.QAbstractProxyModel):
+    """
+    Filter the rows of a ProcessTableModel in memory by name substring, user and status.
+
+    Filters combine with AND; None disables a filter. The accepted rows are computed once
+    per query, a name query as the pids of the source model's NameIndex, and then kept up
+    to date from the source's row insertions, removals, changes and re-sorts, so no filter
+    runs per row on a refresh. Sorting is delegated to the source model, which keeps its
+    rows ordered incrementally.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name = None
+        self.user = None
+        self.status = None
+        # accepted source rows in ascending order, None when no filter is set
+        self._accepted = None
+        self._connections = []
+        # accepted pids and (index, pid) of the persistent indexes across a layout change of the source
+        self._moving = None
+        self._persistent = []
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        for signal, slot in self._connections:
+            signal.disconnect(slot)
+        super().setSourceModel(model)
+        self._connections = [
+            (model.modelAboutToBeReset, self.beginResetModel),
+            (model.modelReset, self._source_reset),
+            (model.rowsAboutToBeInserted, self._source_rows_about_to_be_inserted),
+            (model.rowsInserted, self._source_rows_inserted),
+            (model.rowsAboutToBeRemoved, self._source_rows_about_to_be_removed),
+            (model.rowsRemoved, self._source_rows_removed),
+            (model.dataChanged, self._source_data_changed),
+            (model.layoutAboutToBeChanged, self._source_layout_about_to_be_changed),
+            (model.layoutChanged, self._source_layout_changed),
+        ]
+        for signal, slot in self._connections:
+            signal.connect(slot)
+        self._filter()
+        self.endResetModel()
+
+    def set_filters(self, name=None, user=None, status=None):
+        """
+        Replace all filters at once.
+
+        :param name: Substring the process name must contain.
+        :param user: Exact owner user name.
+        :param status: Exact process status, e.g. 'running'.
+        """
+        self.beginResetModel()
+        self.name, self.user, self.status = name or None, user, status
+        self._filter()
+        self.endResetModel()
+
+    def set_name(self, name):
+        """Filter by process name substring; an empty string or None clears it."""
+        self.set_filters(name, self.user, self.status)
+
+    def set_user(self, user):
+        """Filter by owner; None clears it."""
+        self.set_filters(self.name, user, self.status)
+
+    def set_status(self, status):
+        """Filter by status; None clears it."""
+        self.set_filters(self.name, self.user, status)
+
+    def _accepts(self, row) -> bool:
+        pid, name, status, username, exe = row
+        if self.user is not None and username != self.user:
+            return False
+        if self.status is not None and status != self.status:
+            return False
+        return self.name is None or (isinstance(name, str) and self.name in name)
+
+    def _filter(self):
+        """Compute the accepted source rows from scratch."""
+        source = self.sourceModel()
+        if source is None or (self.name is None and self.user is None and self.status is None):
+            self._accepted = None
+            return
+        pids = source.name_index.pids(self.name) if self.name is not None else None
+        if pids is not None and len(pids) < source.rowCount() // 8:
+            # a selective query: locate the few matching processes instead of scanning every row
+            rows = (source.view_row(pid) for pid in pids)
+            self._accepted = sorted(row for row in rows if row is not None and self._accepts(source.row(row)))
+        else:
+            self._accepted = [row for row in range(source.rowCount()) if self._accepts(source.row(row))]
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().rowCount() if self._accepted is None else len(self._accepted)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        return self.sourceModel().headerData(section, orientation, role)
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        row = index.row() if self._accepted is None else self._accepted[index.row()]
+        return self.sourceModel().index(row, index.column())
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        row = index.row()
+        if self._accepted is not None:
+            row = bisect_left(self._accepted, index.row())
+            if row == len(self._accepted) or self._accepted[row] != index.row():
+                return QtCore.QModelIndex()
+        return self.index(row, index.column())
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def _source_reset(self):
+        self._filter()
+        self.endResetModel()
+
+    def _source_rows_about_to_be_inserted(self, parent, first, last):
+        if self._accepted is None:
+            self.beginInsertRows(QtCore.QModelIndex(), first, last)
+
+    def _source_rows_inserted(self, parent, first, last):
+        if self._accepted is None:
+            self.endInsertRows()
+            return
+        accepted, count = self._accepted, last - first + 1
+        position = bisect_left(accepted, first)
+        accepted[position:] = [row + count for row in accepted[position:]]
+        source = self.sourceModel()
+        rows = [row for row in range(first, last + 1) if self._accepts(source.row(row))]
+        if rows:
+            self.beginInsertRows(QtCore.QModelIndex(), position, position + len(rows) - 1)
+            accepted[position:position] = rows
+            self.endInsertRows()
+
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        if self._accepted is None:
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            return
+        accepted = self._accepted
+        start, stop = bisect_left(accepted, first), bisect_right(accepted, last)
+        if stop > start:
+            self.beginRemoveRows(QtCore.QModelIndex(), start, stop - 1)
+            del accepted[start:stop]
+            self.endRemoveRows()
+
+    def _source_rows_removed(self, parent, first, last):
+        if self._accepted is None:
+            self.endRemoveRows()
+            return
+        accepted, count = self._accepted, last - first + 1
+        position = bisect_left(accepted, first)
+        accepted[position:] = [row - count for row in accepted[position:]]
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        if self._accepted is None:
+            self.dataChanged.emit(self.mapFromSource(top_left), self.mapFromSource(bottom_right), roles)
+            return
+        source, accepted = self.sourceModel(), self._accepted
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            position = bisect_left(accepted, row)
+            shown = position < len(accepted) and accepted[position] == row
+            if self._accepts(source.row(row)):
+                if shown:
+                    self.dataChanged.emit(self.index(position, top_left.column()),
+                                          self.index(position, bottom_right.column()), roles)
+                else:
+                    self.beginInsertRows(QtCore.QModelIndex(), position, position)
+                    accepted.insert(position, row)
+                    self.endInsertRows()
+            elif shown:
+                self.beginRemoveRows(QtCore.QModelIndex(), position, position)
+                del accepted[position]
+                self.endRemoveRows()
+
+    def _source_layout_about_to_be_changed(self):
+        self.layoutAboutToBeChanged.emit()
+        source = self.sourceModel()
+        self._persistent = [(index, source.row(self.mapToSource(index).row())[0])
+                            for index in self.persistentIndexList()]
+        if self._accepted is not None:
+            # the same processes stay accepted, only their source rows move
+            self._moving = [source.row(row)[0] for row in self._accepted]
+
+    def _source_layout_changed(self):
+        source = self.sourceModel()
+        if self._accepted is not None:
+            self._accepted = sorted(source.view_row(pid) for pid in self._moving)
+            self._moving = None
+        for index, pid in self._persistent:
+            self.changePersistentIndex(index, self.mapFromSource(source.index(source.view_row(pid), index.column())))
+        self._persistent = []
+        self.layoutChanged.emit()
+
+
+class ConnectionsTableModel(RowsTableModel):
+    """
+    Connections of one process, refreshed in place.
+
+    Rows are keyed by their first column (the fd) and kept in fd order; update_rows()
+    only emits the insertions, removals and cell changes between two refreshes.
+    """
+
+    def __init__(self, headers: list, parent=None):
+        super().__init__(headers, parent)
+        self.pid = None
+
+    def set_rows(self, rows, pid: int = None):
+        """
+        Show the connections of a process, replacing whatever was shown.
+
+        :param rows: Connection rows, the fd first.
+        :param pid: The process the rows belong to.
+        """
+        self.pid = pid
+        super().set_rows(sorted(rows, key=lambda row: row[0]))
+
+    def update_rows(self, rows):
+        """
+        Apply a fresh list of connection rows of the same process incrementally.
+
+        :param rows: Connection rows, the fd first.
+        """
+        new = {row[0]: row for row in rows}
+        for position in range(len(self._rows) - 1, -1, -1):
+            if self._rows[position][0] not in new:
+                self.beginRemoveRows(QtCore.QModelIndex(), position, position)
+                del self._rows[position]
+                self.endRemoveRows()
+        keys = [row[0] for row in self._rows]
+        for position, row in enumerate(self._rows):
+            fresh = new.pop(row[0])
+            if fresh != row:
+                self._rows[position] = fresh
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.headers) - 1))
+        for fd in sorted(new):
+            position = bisect_left(keys, fd)
+            self.beginInsertRows(QtCore.QModelIndex(), position, position)
+            self._rows.insert(position, new[fd])
+            keys.insert(position, fd)
+            self.endInsertRows()
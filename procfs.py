@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import errno
+import os
+import pwd
+import socket
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque, namedtuple
+
+PROC_PATH = '/proc'
+PASSWD_PATH = '/etc/passwd'
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+# /proc/<pid>/stat state letters mapped to the status strings psutil reports
+STATUS_CODES = {
+    'R': 'running',
+    'S': 'sleeping',
+    'D': 'disk-sleep',
+    'T': 'stopped',
+    't': 'tracing-stop',
+    'Z': 'zombie',
+    'X': 'dead',
+    'x': 'dead',
+    'K': 'wake-kill',
+    'W': 'waking',
+    'I': 'idle',
+    'P': 'parked',
+}
+
+# /proc/net/tcp* state codes mapped to the status strings psutil reports
+TCP_STATES = {
+    '01': 'ESTABLISHED',
+    '02': 'SYN_SENT',
+    '03': 'SYN_RECV',
+    '04': 'FIN_WAIT1',
+    '05': 'FIN_WAIT2',
+    '06': 'TIME_WAIT',
+    '07': 'CLOSE',
+    '08': 'CLOSE_WAIT',
+    '09': 'LAST_ACK',
+    '0A': 'LISTEN',
+    '0B': 'CLOSING',
+}
+
+# /proc/net table -> (family, type)
+NET_TABLES = {
+    'tcp': (socket.AF_INET, socket.SOCK_STREAM),
+    'tcp6': (socket.AF_INET6, socket.SOCK_STREAM),
+    'udp': (socket.AF_INET, socket.SOCK_DGRAM),
+    'udp6': (socket.AF_INET6, socket.SOCK_DGRAM),
+}
+
+# netlink process connector, see linux/connector.h and linux/cn_proc.h
+NETLINK_CONNECTOR = 11
+NLMSG_DONE = 3
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+PROC_EVENTS = {
+    0x00000001: 'fork',
+    0x00000002: 'exec',
+    0x00000200: 'comm',
+    0x80000000: 'exit',
+}
+PROC_EVENT_NONE = 0
+# struct nlmsghdr, struct cn_msg and the header of struct proc_event
+NLMSG_HEADER = struct.Struct('=IHHII')
+CN_MSG_HEADER = struct.Struct('=IIIIHH')
+PROC_EVENT_HEADER = struct.Struct('=IIQ')
+
+Address = namedtuple('Address', ['ip', 'port'])
+Connection = namedtuple('Connection', ['fd', 'family', 'type', 'laddr', 'raddr', 'status'])
+# kind is 'fork', 'exec', 'comm' or 'exit'; the other fields are read from /proc when the event
+# arrives and are None when the process was already gone; exe is only read on exec
+ProcEvent = namedtuple('ProcEvent', ['kind', 'pid', 'start', 'name', 'uid', 'exe'])
+
+
+class UserCache:
+    """UID to user name cache, dropped whenever the passwd file changes."""
+
+    def __init__(self, passwd_path: str = PASSWD_PATH):
+        """
+        :param passwd_path: File whose changes invalidate the cache.
+        """
+        self.passwd_path = passwd_path
+        self._names = {}
+        self._stamp = self._passwd_stamp()
+
+    def _passwd_stamp(self):
+        try:
+            st = os.stat(self.passwd_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def check(self) -> bool:
+        """
+        Drop the cache if the passwd file changed since the last check.
+
+        Call it once per scan rather than per lookup.
+
+        :return: True if the cache was invalidated.
+        """
+        stamp = self._passwd_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        self._names.clear()
+        return True
+
+    def name(self, uid):
+        """
+        Resolve a UID to a user name, hitting NSS only once per distinct UID.
+
+        :param uid: Numeric user ID, or None if it could not be read.
+        :return: The user name, the UID as a string when it has no passwd entry, or None.
+        """
+        if uid is None:
+            return None
+        try:
+            return self._names[uid]
+        except KeyError:
+            pass
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        self._names[uid] = name
+        return name
+
+
+class IdentityCache:
+    """
+    LRU cache of per-process attributes that only change when the process execs, such as
+    name, exe and cmdline, keyed by (pid, create_time) identity. exec keeps the identity, so
+    callers discard an entry once the command name no longer matches. Bounded by entry count.
+    """
+
+    def __init__(self, max_entries: int = 16384):
+        """
+        :param max_entries: Number of process identities kept before the least recently used is evicted.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def lookup(self, key) -> dict:
+        """
+        Get the cached attributes of a process identity.
+
+        :param key: Tuple (pid, create_time).
+        :return: Dictionary of cached attributes, empty if nothing is cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        self._entries.move_to_end(key)
+        return entry
+
+    def update(self, key, **attrs):
+        """
+        Store attributes for a process identity, evicting the oldest identities when full.
+
+        :param key: Tuple (pid, create_time).
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        entry.update(attrs)
+
+    def discard(self, key):
+        """Forget a process identity, e.g. once the process exited."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ProcReader:
+    """Read process rows straight from /proc, reusing a single read buffer for every file."""
+
+    def __init__(self, proc_path: str = PROC_PATH, bufsize: int = 8192, users: UserCache = None):
+        """
+        :param proc_path: Mount point of procfs.
+        :param bufsize: Size of the reusable read buffer, large enough for /proc/<pid>/status.
+        :param users: UID to name cache, shared with other readers if given.
+        """
+        self.proc_path = proc_path
+        self.users = users if users is not None else UserCache()
+        self._buf = bytearray(bufsize)
+        self._view = memoryview(self._buf)
+
+    def pids(self):
+        """
+        List the pids currently present in /proc.
+
+        :return: Sorted list of pids.
+        """
+        return sorted(int(entry.name) for entry in os.scandir(self.proc_path) if entry.name.isdigit())
+
+    def read(self, path: str):
+        """
+        Read a small /proc file into the shared buffer.
+
+        :param path: Absolute path of the file.
+        :return: The file content as bytes.
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            n = os.readv(fd, [self._buf])
+        finally:
+            os.close(fd)
+        return bytes(self._view[:n])
+
+    def read_stat(self, pid: int):
+        """
+        Parse /proc/<pid>/stat.
+
+        :param pid: Process ID.
+        :return: Tuple (name, status, ppid, start, ticks, rss) where start is the start time in clock
+            ticks since boot, ticks the user + system CPU time consumed, also in clock ticks, and rss
+            the resident set size in bytes.
+        """
+        data = self.read(f"{self.proc_path}/{pid}/stat")
+        # the command name may itself contain spaces and parentheses
+        lpar = data.index(b'(')
+        rpar = data.rindex(b')')
+        name = data[lpar + 1:rpar].decode(errors='replace')
+        fields = data[rpar + 2:].split(b' ', 22)
+        state = fields[0].decode()
+        ticks = int(fields[11]) + int(fields[12])
+        return name, STATUS_CODES.get(state, state), int(fields[1]), int(fields[19]), ticks, int(fields[21]) * PAGE_SIZE
+
+    def read_uid(self, pid: int):
+        """
+        Get the real UID of a process from /proc/<pid>/status.
+
+        :param pid: Process ID.
+        :return: The real UID as an int.
+        """
+        data = self.read(f"{self.proc_path}/{pid}/status")
+        start = data.index(b'\nUid:') + 5
+        return int(data[start:data.index(b'\n', start)].split()[0])
+
+    def read_exe(self, pid: int):
+        """
+        Resolve the /proc/<pid>/exe link.
+
+        :param pid: Process ID.
+        :return: The executable path, '' for kernel threads, None when access is denied.
+        """
+        try:
+            return os.readlink(f"{self.proc_path}/{pid}/exe")
+        except PermissionError:
+            return None
+        except FileNotFoundError:
+            # kernel threads have no executable; a vanished pid is caught by the next read
+            return ''
+
+    def read_cmdline(self, pid: int):
+        """
+        Read the argument vector of a process.
+
+        :param pid: Process ID.
+        :return: List of arguments, empty for kernel threads and zombies.
+        """
+        with open(f"{self.proc_path}/{pid}/cmdline", 'rb') as f:
+            data = f.read()
+        return [arg.decode(errors='replace') for arg in data.rstrip(b'\0').split(b'\0')] if data else []
+
+    def full_name(self, pid: int, name: str) -> str:
+        """
+        Undo the 15 character truncation of the stat command name, the way psutil does.
+
+        :param pid: Process ID.
+        :param name: Command name from read_stat().
+        :return: The base name of the first argument when name is a prefix of it, else name.
+        """
+        if len(name) < 15:
+            return name
+        try:
+            cmdline = self.read_cmdline(pid)
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            return name
+        if cmdline:
+            extended = os.path.basename(cmdline[0])
+            if extended.startswith(name):
+                return extended
+        return name
+
+    def has_socket(self, pid: int) -> bool:
+        """
+        Tell whether a process holds at least one socket, stopping at the first one found.
+
+        Only the fd table is read, the kernel socket tables are never parsed.
+
+        :param pid: Process ID.
+        :return: True if one of the process's fds is a socket.
+        :raises PermissionError: If the fd table of the process cannot be read.
+        """
+        with os.scandir(f"{self.proc_path}/{pid}/fd") as fds:
+            for fd in fds:
+                try:
+                    if os.readlink(fd.path).startswith('socket:['):
+                        return True
+                except FileNotFoundError:
+                    # the fd was closed while we were listing them
+                    continue
+        return False
+
+
+def comm_matches(comm: str, name: str) -> bool:
+    """
+    Check whether a command name from stat still belongs to a known process name.
+
+    :param comm: Command name as read_stat() reports it, truncated to 15 characters.
+    :param name: The stored name, possibly extended by ProcReader.full_name().
+    :return: False when the process exec'd or was renamed since name was read.
+    """
+    return comm == name or (len(comm) >= 15 and isinstance(name, str) and name.startswith(comm))
+
+
+def scan_stat(proc_path: str, pids) -> tuple:
+    """
+    Read /proc/<pid>/stat for a range of pids, typically in a worker process.
+
+    The rows are packed column-wise into arrays and one text blob, so a whole range
+    crosses the process boundary as a handful of bytes objects instead of a pickled
+    tuple per process. Unpack the result with decode_stat().
+
+    :param proc_path: Mount point of procfs.
+    :param pids: Iterable of pids, e.g. a slice of an array('i').
+    :return: Tuple (pids, ppids, starts, ticks, rss, text, now): five array buffers, the names and
+        statuses joined by NUL, and the monotonic time the range was read at.
+    """
+    reader = ProcReader(proc_path)
+    found, ppids, starts, ticks, rss = array('i'), array('i'), array('Q'), array('Q'), array('Q')
+    text = []
+    for pid in pids:
+        try:
+            name, status, ppid, start, cpu, resident = reader.read_stat(pid)
+        except (FileNotFoundError, ProcessLookupError, ValueError):
+            continue
+        found.append(pid)
+        ppids.append(ppid)
+        starts.append(start)
+        ticks.append(cpu)
+        rss.append(resident)
+        # command names cannot contain NUL
+        text.append(name)
+        text.append(status)
+    columns = (found, ppids, starts, ticks, rss)
+    return tuple(column.tobytes() for column in columns) + ('\0'.join(text).encode(), time.monotonic())
+
+
+def decode_stat(result):
+    """
+    Unpack what scan_stat() returned.
+
+    :param result: A scan_stat() result.
+    :return: Generator of tuples (pid, name, status, ppid, start, ticks, rss, now).
+    """
+    columns = []
+    for typecode, data in zip('iiQQQ', result[:5]):
+        column = array(typecode)
+        column.frombytes(data)
+        columns.append(column)
+    text = result[5].decode().split('\0')
+    now = result[6]
+    for i, (pid, ppid, start, ticks, rss) in enumerate(zip(*columns)):
+        yield pid, text[2 * i], text[2 * i + 1], ppid, start, ticks, rss, now
+
+
+class SocketIndex:
+    """
+    System-wide map of inet sockets to the processes holding them.
+
+    build() parses the /proc/net tables once and walks every fd table once; after that,
+    per-process connections and port owners are dictionary lookups.
+    """
+
+    def __init__(self, reader: ProcReader):
+        """
+        :param reader: ProcReader used to list pids and read /proc.
+        """
+        self.reader = reader
+        # inode -> Connection without fd
+        self._sockets = {}
+        # pid -> list of Connection
+        self._by_pid = {}
+        # local port -> list of (pid, Connection)
+        self._by_port = {}
+
+    @staticmethod
+    def _address(hex_address: str, family: int):
+        ip, port = hex_address.split(':')
+        raw = bytes.fromhex(ip)
+        # the kernel prints each 32-bit word in host (little endian) order
+        raw = b''.join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+        return Address(socket.inet_ntop(family, raw), int(port, 16))
+
+    def _parse_tables(self):
+        sockets = {}
+        for table, (family, kind) in NET_TABLES.items():
+            try:
+                with open(f"{self.reader.proc_path}/net/{table}") as f:
+                    next(f)
+                    for line in f:
+                        fields = line.split()
+                        laddr = self._address(fields[1], family)
+                        raddr = self._address(fields[2], family)
+                        if not raddr.port and raddr.ip in ('0.0.0.0', '::'):
+                            raddr = None
+                        status = TCP_STATES.get(fields[3], 'NONE') if kind == socket.SOCK_STREAM else 'NONE'
+                        sockets[int(fields[9])] = (family, kind, laddr, raddr, status)
+            except FileNotFoundError:
+                # e.g. IPv6 disabled
+                continue
+        return sockets
+
+    def build(self):
+        """Rebuild the index from the current state of /proc."""
+        sockets = self._parse_tables()
+        by_pid, by_port = {}, {}
+        for pid in self.reader.pids():
+            try:
+                fds = os.scandir(f"{self.reader.proc_path}/{pid}/fd")
+            except (FileNotFoundError, PermissionError):
+                continue
+            with fds:
+                for fd in fds:
+                    try:
+                        target = os.readlink(fd.path)
+                    except (FileNotFoundError, PermissionError):
+                        continue
+                    if not target.startswith('socket:['):
+                        continue
+                    entry = sockets.get(int(target[8:-1]))
+                    if entry is None:
+                        # unix or netlink socket
+                        continue
+                    conn = Connection(int(fd.name), *entry)
+                    by_pid.setdefault(pid, []).append(conn)
+                    by_port.setdefault(conn.laddr.port, []).append((pid, conn))
+        self._sockets, self._by_pid, self._by_port = sockets, by_pid, by_port
+
+    def connections(self, pid: int) -> list:
+        """
+        Get the inet connections of a process.
+
+        :param pid: Process ID.
+        :return: List of Connection, empty if it has none or its fds could not be read.
+        """
+        return self._by_pid.get(pid, [])
+
+    def port_owners(self, port: int) -> list:
+        """
+        Find who holds sockets bound to a local port.
+
+        :param port: Local port number.
+        :return: List of (pid, Connection).
+        """
+        return self._by_port.get(port, [])
+
+
+class ProcConnector:
+    """
+    Process fork, exec, rename and exit events from the Linux netlink process connector.
+
+    A daemon thread receives the events and reads the new process's stat and status right
+    away, so even processes that exit within milliseconds are seen with their name. Events
+    queue up until drain() collects them. Subscribing needs CAP_NET_ADMIN; the constructor
+    raises OSError (usually PermissionError) when the connector cannot be used.
+    """
+
+    def __init__(self, proc_path: str = PROC_PATH, max_events: int = 65536, timeout: float = 1.0):
+        """
+        :param proc_path: Mount point of procfs.
+        :param max_events: Events kept before the oldest are dropped and lost is set.
+        :param timeout: Seconds to wait for the kernel to acknowledge the subscription.
+        """
+        self.reader = ProcReader(proc_path)
+        self.max_events = max_events
+        # set when events were dropped, so the caller knows to rescan /proc in full
+        self.lost = False
+        # set when the receiving thread stopped on an error; no more events will come
+        self.dead = False
+        self._events = deque()
+        self._closed = False
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            self._sock.bind((0, CN_IDX_PROC))
+            self._sock.settimeout(timeout)
+            self._sock.send(self._control(PROC_CN_MCAST_LISTEN))
+            self._wait_ack()
+        except OSError:
+            self._sock.close()
+            raise
+        # short timeout so the thread notices close()
+        self._sock.settimeout(0.5)
+        self._thread = threading.Thread(target=self._run, name='proc-connector', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _control(op: int) -> bytes:
+        payload = struct.pack('=I', op)
+        cn_msg = CN_MSG_HEADER.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+        return NLMSG_HEADER.pack(NLMSG_HEADER.size + len(cn_msg), NLMSG_DONE, 0, 0, 0) + cn_msg
+
+    @staticmethod
+    def _messages(data: bytes):
+        """Yield (what, payload) for each proc_event in a netlink datagram."""
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length = NLMSG_HEADER.unpack_from(data, offset)[0]
+            if length < NLMSG_HEADER.size:
+                return
+            start = offset + NLMSG_HEADER.size + CN_MSG_HEADER.size
+            what = PROC_EVENT_HEADER.unpack_from(data, start)[0]
+            yield what, data[start + PROC_EVENT_HEADER.size:offset + length]
+            # NLMSG_ALIGN
+            offset += (length + 3) & ~3
+
+    def _wait_ack(self):
+        # the kernel answers the subscription with an event carrying an errno
+        while True:
+            for what, payload in self._messages(self._sock.recv(65536)):
+                if what == PROC_EVENT_NONE:
+                    err = struct.unpack_from('=I', payload)[0]
+                    if err:
+                        raise OSError(err, os.strerror(err))
+                    return
+
+    def _run(self):
+        while not self._closed:
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # the socket buffer overflowed, some events are gone
+                    self.lost = True
+                    continue
+                self.lost = self.dead = True
+                return
+            for what, payload in self._messages(data):
+                kind = PROC_EVENTS.get(what)
+                if kind is None:
+                    continue
+                if kind == 'fork':
+                    # parent pid, parent tgid, child pid, child tgid
+                    pid, tgid = struct.unpack_from('=II', payload, 8)
+                else:
+                    pid, tgid = struct.unpack_from('=II', payload)
+                if pid != tgid:
+                    # a thread, not a process
+                    continue
+                self._capture(kind, pid)
+
+    def _capture(self, kind: str, pid: int):
+        reader = self.reader
+        start = name = uid = exe = None
+        try:
+            name, _, _, start = reader.read_stat(pid)[:4]
+            name = reader.full_name(pid, name)
+            uid = reader.read_uid(pid)
+            if kind == 'exec':
+                exe = reader.read_exe(pid)
+        except (FileNotFoundError, ProcessLookupError, ValueError):
+            pass
+        if len(self._events) >= self.max_events:
+            self._events.popleft()
+            self.lost = True
+        self._events.append(ProcEvent(kind, pid, start, name, uid, exe))
+
+    def drain(self):
+        """
+        Take the events received since the last call.
+
+        :return: Tuple (events, lost): the ProcEvents in arrival order, and whether any were dropped.
+        """
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        lost, self.lost = self.lost, False
+        return events, lost
+
+    def close(self):
+        """Unsubscribe and stop the receiving thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._thread.join()
+        try:
+            self._sock.send(self._control(PROC_CN_MCAST_IGNORE))
+        except OSError:
+            pass
+        self._sock.close()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+
+class _Pending:
+    """Placeholder for a column value that has not been loaded yet; shows as an empty cell."""
+    __slots__ = ()
+
+    def __str__(self):
+        return ''
+
+    def __repr__(self):
+        return 'PENDING'
+
+
+PENDING = _Pending()
+
+# ProcessSnapshot.uid values for a UID that could not be read and one not loaded yet
+UID_NONE = -1
+UID_PENDING = -2
+
+
+@dataclass
+class SnapshotDelta:
+    """
+    Difference between two consecutive process snapshots.
+
+    Rows are (pid, name, status, username, exe) tuples. A reused pid shows up
+    as a removed row followed by an added one, so apply removals first. transient holds
+    processes that started and exited between the two snapshots, which only process
+    events can reveal; they are in neither snapshot.
+    """
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    transient: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.transient)
+
+
+class StringPool:
+    """Deduplicated string storage; columns keep small integer codes into it instead of the strings."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def add(self, value) -> int:
+        """
+        Intern a value (a string or None) and get its code.
+
+        :param value: The value to store.
+        :return: The integer code of the value in this pool.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def codes_where(self, predicate) -> set:
+        """
+        Evaluate a predicate once per distinct value.
+
+        :param predicate: Callable taking a value and returning a bool.
+        :return: Set of codes whose value matches.
+        """
+        return {code for code, value in enumerate(self.values) if predicate(value)}
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ProcessSnapshot:
+    """
+    Columnar process snapshot.
+
+    Pids, ppids, CPU percents and resident set sizes live in typed arrays, and name/status/username/exe are stored as
+    codes into per-column string pools. Indexing or iterating yields the usual
+    (pid, name, status, username, exe) tuples, so it can stand in for a list of rows.
+
+    Pools only ever grow, so consecutive snapshots can share them: a process that survives
+    a scan keeps its codes. start (the create time in the backend's units) and uid
+    complete the identity and owner of every row.
+    """
+
+    COLUMNS = ('pid', 'name', 'status', 'username', 'exe')
+    POOLED = ('name', 'status', 'username', 'exe')
+    NUMERIC = ('pid', 'ppid', 'cpu', 'rss')
+
+    def __init__(self, pools: dict = None):
+        """
+        :param pools: String pools to share with an earlier snapshot, fresh ones if None.
+        """
+        # set by ProcessManager: scan counter, the delta from the previous scan,
+        # the wall-clock and CPU seconds the scan took (CPU including worker threads and
+        # processes), and the wall-clock seconds of each shard of the full reads
+        self.generation = None
+        self.delta = None
+        self.scan_seconds = None
+        self.scan_cpu_seconds = None
+        self.shard_seconds = None
+        self.pid = array('i')
+        self.ppid = array('i')
+        self.cpu = array('d')
+        self.rss = array('Q')
+        self.start = array('d')
+        # real UID, or UID_NONE / UID_PENDING
+        self.uid = array('q')
+        self._tree = None
+        self.pools = pools if pools is not None else {column: StringPool() for column in self.POOLED}
+        self.codes = {column: array('I') for column in self.POOLED}
+
+    @classmethod
+    def from_rows(cls, rows, ppids=None, cpu=None, rss=None):
+        """
+        Build a snapshot from row tuples.
+
+        :param rows: Iterable of (pid, name, status, username, exe), sorted by pid.
+        :param ppids: Optional iterable of parent pids in the same order as rows.
+        :param cpu: Optional iterable of CPU percents in the same order as rows.
+        :param rss: Optional iterable of resident set sizes in bytes in the same order as rows.
+        :return: A new ProcessSnapshot.
+        """
+        snap = cls()
+        for row in rows:
+            snap.append(row)
+        if ppids is not None:
+            snap.ppid = array('i', ppids)
+        if cpu is not None:
+            snap.cpu = array('d', cpu)
+        if rss is not None:
+            snap.rss = array('Q', rss)
+        return snap
+
+    def append(self, row, ppid: int = 0, cpu: float = 0.0, rss: int = 0, start: float = 0.0, uid: int = UID_NONE):
+        """
+        Append a (pid, name, status, username, exe) row.
+
+        :param row: The row tuple.
+        :param ppid: Parent pid of the process.
+        :param cpu: CPU percent of the process over the last refresh interval.
+        :param rss: Resident set size of the process in bytes.
+        :param start: Create time of the process.
+        :param uid: Real UID of the process.
+        """
+        self.pid.append(row[0])
+        self.ppid.append(ppid)
+        self.cpu.append(cpu)
+        self.rss.append(rss)
+        self.start.append(start)
+        self.uid.append(uid)
+        for column, value in zip(self.POOLED, row[1:]):
+            self.codes[column].append(self.pools[column].add(value))
+
+    def value(self, index: int, column: str):
+        """Get a single cell by row index and column name."""
+        if column in self.NUMERIC:
+            return getattr(self, column)[index]
+        return self.pools[column][self.codes[column][index]]
+
+    def record(self, index: int) -> dict:
+        """
+        Get a row as a mapping of column name to value, including ppid, cpu and rss.
+
+        :param index: Row index.
+        """
+        record = dict(zip(self.COLUMNS, self[index]))
+        record['ppid'] = self.ppid[index]
+        record['cpu'] = self.cpu[index]
+        record['rss'] = self.rss[index]
+        return record
+
+    def index_of(self, pid: int):
+        """
+        Find the row index of a pid.
+
+        :param pid: Process ID.
+        :return: The row index, or None if the pid is not in the snapshot.
+        """
+        index = bisect_left(self.pid, pid)
+        if index < len(self.pid) and self.pid[index] == pid:
+            return index
+        return None
+
+    def find(self, pid: int, start):
+        """
+        Find the row index of a process identity.
+
+        :param pid: Process ID.
+        :param start: Create time of the process, as stored in the start column.
+        :return: The row index, or None if no row has both that pid and that start.
+        """
+        index = self.index_of(pid)
+        if index is not None and self.start[index] == start:
+            return index
+        return None
+
+    def key(self, index: int):
+        """Get the (pid, create_time) identity of a row."""
+        return self.pid[index], self.start[index]
+
+    def repool(self):
+        """
+        Move the string columns onto fresh pools holding only the values still in use.
+
+        Snapshots that shared the old pools keep them.
+        """
+        self.pools = dict(self.pools)
+        for column in self.POOLED:
+            values, pool = self.pools[column].values, StringPool()
+            self.codes[column] = array('I', [pool.add(values[code]) for code in self.codes[column]])
+            self.pools[column] = pool
+
+    def where(self, column: str, predicate) -> list:
+        """
+        Get the row indexes whose value in column matches predicate.
+
+        For pooled columns the predicate runs once per distinct value, not once per row.
+
+        :param column: Column name.
+        :param predicate: Callable taking a value and returning a bool.
+        :return: List of matching row indexes, in snapshot order.
+        """
+        if column in self.pools:
+            matched = self.pools[column].codes_where(predicate)
+            return [i for i, code in enumerate(self.codes[column]) if code in matched]
+        return [i for i, value in enumerate(getattr(self, column)) if predicate(value)]
+
+    def select(self, indexes):
+        """
+        Build a new snapshot from a subset of rows.
+
+        :param indexes: Iterable of row indexes.
+        :return: A new ProcessSnapshot.
+        """
+        snap = ProcessSnapshot()
+        for i in indexes:
+            snap.append(self[i], self.ppid[i], self.cpu[i], self.rss[i], self.start[i], self.uid[i])
+        return snap
+
+    def tree(self):
+        """
+        Get the parent/child index of this snapshot, building it on first use.
+
+        :return: ProcessTree.
+        """
+        if self._tree is None:
+            self._tree = ProcessTree(self)
+        return self._tree
+
+    def __getitem__(self, index: int):
+        pools, codes = self.pools, self.codes
+        return (self.pid[index],) + tuple(pools[column].values[codes[column][index]] for column in self.POOLED)
+
+    def __iter__(self):
+        for index in range(len(self.pid)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self.pid)
+
+
+class ProcessTree:
+    """
+    Parent/child index over a ProcessSnapshot, with CPU and RSS totals per subtree.
+
+    Every total is computed in one bottom-up pass when the tree is built, so looking up a
+    subtree afterwards costs a pid lookup. Processes whose parent is not in the snapshot
+    (pid 1, kthreadd, or a parent that exited) are roots.
+    """
+
+    def __init__(self, snapshot: ProcessSnapshot):
+        """
+        :param snapshot: The snapshot to index; row indexes refer to it.
+        """
+        self.snapshot = snapshot
+        count = len(snapshot)
+        # parent row index of every row, -1 for roots
+        self.parents = array('i', [-1]) * count
+        self._children = {}
+        for index, ppid in enumerate(snapshot.ppid):
+            parent = snapshot.index_of(ppid)
+            if parent is not None and parent != index:
+                self.parents[index] = parent
+                self._children.setdefault(parent, []).append(index)
+        self.roots = [index for index in range(count) if self.parents[index] < 0]
+        self.sizes = array('I', [1]) * count
+        self.cpu = array('d', snapshot.cpu)
+        self.rss = array('Q', snapshot.rss)
+        # children before parents: accumulate in reverse breadth-first order from the roots
+        order = list(self.roots)
+        for index in order:
+            order.extend(self._children.get(index, ()))
+        for index in reversed(order):
+            parent = self.parents[index]
+            if parent >= 0:
+                self.sizes[parent] += self.sizes[index]
+                self.cpu[parent] += self.cpu[index]
+                self.rss[parent] += self.rss[index]
+
+    def children(self, pid: int) -> list:
+        """
+        Get the pids of the direct children of a process.
+
+        :param pid: Process ID.
+        :return: List of pids, empty if it has none or is not in the snapshot.
+        """
+        index = self.snapshot.index_of(pid)
+        return [self.snapshot.pid[child] for child in self._children.get(index, ())]
+
+    def descendants(self, pid: int) -> list:
+        """
+        Get the pids of every process below a process, breadth first.
+
+        :param pid: Process ID.
+        :return: List of pids, not including pid itself.
+        """
+        index = self.snapshot.index_of(pid)
+        order = list(self._children.get(index, ()))
+        for child in order:
+            order.extend(self._children.get(child, ()))
+        return [self.snapshot.pid[child] for child in order]
+
+    def totals(self, pid: int):
+        """
+        Get the totals of the subtree rooted at a process, the process itself included.
+
+        :param pid: Process ID.
+        :return: Tuple (processes, cpu, rss), or None if the pid is not in the snapshot.
+        """
+        index = self.snapshot.index_of(pid)
+        if index is None:
+            return None
+        return self.sizes[index], self.cpu[index], self.rss[index]
+
+
+class NameIndex:
+    """
+    Substring index over process names.
+
+    Distinct names are indexed by their trigrams, so a search only verifies the few names
+    sharing all trigrams of the query instead of every process. Kept up to date with
+    add()/remove() as snapshot deltas arrive.
+    """
+
+    def __init__(self):
+        # name -> pids running under that name
+        self._pids = {}
+        # trigram -> names containing it
+        self._trigrams = {}
+        # bumped whenever a name appears, so cached search results can be invalidated
+        self.version = 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build an index from (pid, name, ...) rows.
+
+        :param rows: Iterable of row tuples.
+        :return: A new NameIndex.
+        """
+        index = cls()
+        for row in rows:
+            index.add(row[0], row[1])
+        return index
+
+    @staticmethod
+    def _trigrams_of(text: str):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, pid: int, name):
+        """Index a process under its name."""
+        if not name:
+            return
+        pids = self._pids.get(name)
+        if pids is None:
+            pids = self._pids[name] = set()
+            for trigram in self._trigrams_of(name):
+                self._trigrams.setdefault(trigram, set()).add(name)
+            self.version += 1
+        pids.add(pid)
+
+    def remove(self, pid: int, name):
+        """Drop a process from the index, and its name once no process uses it."""
+        pids = self._pids.get(name)
+        if pids is None:
+            return
+        pids.discard(pid)
+        if not pids:
+            del self._pids[name]
+            for trigram in self._trigrams_of(name):
+                names = self._trigrams[trigram]
+                names.discard(name)
+                if not names:
+                    del self._trigrams[trigram]
+
+    def search(self, text: str) -> set:
+        """
+        Find the names containing text.
+
+        :param text: Substring to look for.
+        :return: Set of matching names.
+        """
+        if len(text) < 3:
+            return {name for name in self._pids if text in name}
+        candidates = None
+        # intersect the rarest trigram sets first
+        for names in sorted((self._trigrams.get(t, set()) for t in self._trigrams_of(text)), key=len):
+            candidates = set(names) if candidates is None else candidates & names
+            if not candidates:
+                return set()
+        return {name for name in candidates if text in name}
+
+    def pids(self, text: str) -> set:
+        """
+        Find the pids whose name contains text.
+
+        :param text: Substring to look for.
+        :return: Set of pids.
+        """
+        return {pid for name in self.search(text) for pid in self._pids[name]}
+
+    def __len__(self):
+        return len(self._pids)
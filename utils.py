@@ -3,54 +3,693 @@
 
 from PyQt5 import QtWidgets
 import psutil
+import time
+from array import array
+from functools import partial
+from dataclasses import dataclass, field
 from datetime import datetime
+from procfs import (CLOCK_TICKS, IdentityCache, ProcConnector, ProcReader, SocketIndex, UserCache, comm_matches,
+                    decode_stat, scan_stat)
+from snapshot import PENDING, UID_NONE, UID_PENDING, ProcessSnapshot, SnapshotDelta
+from workers import AttributePolicy, AttributeScheduler, ShardPool
+
+
+@dataclass
+class ProcessDetails:
+    """Details of a single process, as shown in the details dock."""
+    LABELS = (
+        'Created', 'Name', 'PID', 'Parent', 'Status', 'Owner', 'CPU Percent', 'Mem Percent',
+        'Subtree Processes', 'Subtree CPU Percent', 'Subtree Mem Percent',
+        'CMDLine', 'CWD', 'Executable', 'Connections',
+    )
+
+    pid: int
+    created: float = None
+    name: str = None
+    ppid: int = None
+    status: str = None
+    username: str = None
+    cpu_percent: float = None
+    memory_percent: float = None
+    # totals over the process and its descendants, as of the last scan
+    subtree_processes: int = None
+    subtree_cpu_percent: float = None
+    subtree_memory_percent: float = None
+    cmdline: list = field(default_factory=list)
+    cwd: str = None
+    exe: str = None
+    has_connections: bool = None
+    denied: bool = False
+
+    def as_dict(self) -> dict:
+        """Labelled values in display order."""
+        return {
+            'Created': datetime.fromtimestamp(self.created).strftime('%Y-%m-%d %H:%M'),
+            'Name': self.name,
+            'PID': self.pid,
+            'Parent': self.ppid,
+            'Status': self.status,
+            'Owner': self.username,
+            'CPU Percent': self.cpu_percent,
+            'Mem Percent': self.memory_percent,
+            'Subtree Processes': self.subtree_processes,
+            'Subtree CPU Percent': self.subtree_cpu_percent,
+            'Subtree Mem Percent': self.subtree_memory_percent,
+            #
+            'CMDLine': '\n'.join(self.cmdline),
+            'CWD': self.cwd,
+            'Executable': self.exe,
+            'Connections': 'Has Connections' if self.has_connections else 'No Connections',
+        }
+
+
+class ProcessPool:
+    """
+    Long-lived psutil.Process handles keyed by (pid, create_time).
+
+    A handle remembers its previous CPU times, so cpu_percent(None) returns the usage
+    over the interval since the last call instead of 0.0, without blocking.
+    """
+
+    def __init__(self):
+        self._handles = {}
+
+    def get(self, key, process: psutil.Process = None) -> psutil.Process:
+        """
+        Get the pooled handle of a process identity, creating it if needed.
+
+        :param key: Tuple (pid, create_time).
+        :param process: Existing handle to adopt instead of creating a new one.
+        """
+        handle = self._handles.get(key)
+        if handle is None:
+            handle = self._handles[key] = process if process is not None else psutil.Process(key[0])
+        return handle
+
+    def retain(self, keys):
+        """
+        Drop the handles of processes that are gone.
+
+        :param keys: Identities that are still alive.
+        """
+        self._handles = {key: handle for key, handle in self._handles.items() if key in keys}
+
+    def replace(self, key) -> psutil.Process:
+        """
+        Swap the handle of a process identity for a new one.
+
+        psutil.Process caches name and exe, which exec changes without changing the identity.
+
+        :param key: Tuple (pid, create_time).
+        :return: The new handle, or the old one if the process exited.
+        """
+        try:
+            self._handles[key] = psutil.Process(key[0])
+        except psutil.NoSuchProcess:
+            pass
+        return self.get(key)
+
+    def __len__(self):
+        return len(self._handles)
 
 
 class ProcessManager:
     """Manage system processes and interact with process-related data."""
 
-    def __init__(self):
+    BACKENDS = ('psutil', 'procfs')
+    LAZY_COLUMNS = ('username', 'exe')
+    # status is read by every scan; these are re-read for known processes at their own pace.
+    # The uid takes an open/read/close of /proc/<pid>/status, the exe a single readlink.
+    ATTRIBUTE_POLICIES = (
+        AttributePolicy('username', cost=3, max_age=30.0),
+        AttributePolicy('exe', cost=1, max_age=60.0),
+    )
+
+    def __init__(self, ttl: float = 2.0, backend: str = 'psutil', identity_cache_size: int = 16384,
+                 lazy_columns: tuple = (), max_revalidation_syscalls: int = 256, workers: int = 1,
+                 processes: int = 0, events: bool = False):
+        """
+        :param ttl: How long (in seconds) a process snapshot stays fresh before it is rescanned.
+        :param backend: Collection backend, one of BACKENDS.
+        :param identity_cache_size: Number of processes whose name, exe and cmdline are kept cached.
+        :param lazy_columns: Columns out of LAZY_COLUMNS that scans leave as PENDING for new
+            processes; they are read on demand with load_columns().
+        :param max_revalidation_syscalls: Cap on the syscalls spent per refresh re-reading
+            ATTRIBUTE_POLICIES for known processes; scans and full reads of new processes
+            are not counted.
+        :param workers: Threads sharing the full reads of new processes; None sizes it from
+            the CPU count, 1 reads serially.
+        :param processes: Worker processes sharing the per-scan /proc/<pid>/stat pass of the
+            procfs backend on very large hosts; None sizes it from the CPU count, 0 scans in
+            this process.
+        :param events: Follow process starts, renames and exits with the netlink process connector
+            (procfs backend). Falls back to polling when the connector is not permitted.
+        """
+        if not set(lazy_columns) <= set(self.LAZY_COLUMNS):
+            raise ValueError(f"Lazy columns must be among {self.LAZY_COLUMNS}")
         self.params = ['pid', 'name', 'status', 'username', 'exe']
+        self.lazy_columns = tuple(lazy_columns)
+        self.ttl = ttl
+        self._snapshot = None
+        self._snapshot_time = 0.0
+        # the last scan, kept as the base of the next one even when _snapshot is invalidated
+        self._current = ProcessSnapshot()
+        self._cpu_samples = {}
+        self.pool = ProcessPool()
+        self.attributes = AttributeScheduler(self.ATTRIBUTE_POLICIES, max_revalidation_syscalls)
+        self.shards = ShardPool(workers)
+        # ranges below min_shard pids are not worth a round trip to another process
+        self.scanners = ShardPool(processes, min_shard=2048, processes=True) if processes != 0 else None
+        self._generation = 0
+        self.last_delta = SnapshotDelta()
+        # callables invoked with every new snapshot, on the thread that scanned
+        self.snapshot_listeners = []
+        self.users = UserCache()
+        self.identities = IdentityCache(identity_cache_size)
+        self._proc_reader = ProcReader(users=self.users)
+        self.sockets = SocketIndex(self._proc_reader)
+        self.events = events
+        # started by set_backend() for the procfs backend only
+        self.connector = None
+        # process events drained by the current scan
+        self._events = []
+        self._sockets_time = None
+        self.backend = None
+        self.set_backend(backend)
+
+    def set_backend(self, backend: str):
+        """
+        Switch the collection backend; the next query rescans with it.
+
+        :param backend: 'psutil' to use psutil.process_iter, 'procfs' to read /proc directly.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
+        self.backend = backend
+        # create times are not comparable across backends, start over; skipping a
+        # generation tells consumers of deltas to reload the next snapshot in full
+        self._current = ProcessSnapshot()
+        self._cpu_samples = {}
+        self.pool.retain(())
+        self._generation += 1
+        self.identities.clear()
+        self._set_connector(self.events and backend == 'procfs')
+        self.invalidate()
+
+    def _set_connector(self, enabled: bool):
+        """Start or stop the process event source; stays None when the connector is not permitted."""
+        if enabled and self.connector is None:
+            try:
+                self.connector = ProcConnector(self._proc_reader.proc_path)
+            except OSError:
+                # needs CAP_NET_ADMIN; keep polling /proc
+                pass
+        elif not enabled and self.connector is not None:
+            self.connector.close()
+            self.connector = None
+
+    def snapshot(self, force: bool = False):
+        """
+        Return the current process snapshot, rescanning /proc only when it is stale.
+
+        :param force: Rescan even if the cached snapshot is still fresh.
+        :return: ProcessSnapshot; iterating it yields (pid, name, status, username, exe) tuples.
+        """
+        now = time.monotonic()
+        if force or self._snapshot is None or now - self._snapshot_time >= self.ttl:
+            cpu_start = time.thread_time() + self._offloaded_cpu_seconds()
+            self._snapshot = self._collect()
+            self._snapshot_time = time.monotonic()
+            self._snapshot.scan_seconds = self._snapshot_time - now
+            self._snapshot.scan_cpu_seconds = time.thread_time() + self._offloaded_cpu_seconds() - cpu_start
+            for listener in self.snapshot_listeners:
+                listener(self._snapshot)
+        return self._snapshot
+
+    def _offloaded_cpu_seconds(self):
+        """CPU seconds spent so far by shards on worker threads and processes."""
+        total = self.shards.offloaded_cpu_seconds
+        if self.scanners is not None:
+            total += self.scanners.offloaded_cpu_seconds
+        return total
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next query rescans."""
+        self._snapshot = None
+
+    def refresh(self):
+        """
+        Rescan now and report what changed since the previous scan.
+
+        :return: SnapshotDelta with the added, removed and changed rows.
+        """
+        self.snapshot(force=True)
+        return self.last_delta
+
+    def _scan(self):
+        """
+        Cheap pass over every process, reading only what can change between refreshes.
+
+        CPU percents are measured over the interval since the previous scan; a process
+        seen for the first time reports 0.0. rss is the resident set size in bytes. name is the
+        current command name, which tells when a known process exec'd.
+
+        :return: Generator of tuples (pid, create_time, status, ppid, cpu, rss, name, handle); handle is
+            passed to _read_many.
+        """
+        if self.backend == 'procfs':
+            previous, self._cpu_samples = self._cpu_samples, {}
+            for pid, name, status, ppid, start, ticks, rss, now in self._read_stats():
+                sample = previous.get((pid, start))
+                cpu = 0.0
+                if sample is not None and now > sample[1]:
+                    cpu = (ticks - sample[0]) / CLOCK_TICKS / (now - sample[1]) * 100
+                self._cpu_samples[(pid, start)] = (ticks, now)
+                yield pid, start, status, ppid, cpu, rss, name, name
+        else:
+            for p in psutil.process_iter(attrs=['create_time', 'status', 'ppid', 'memory_info', 'name']):
+                key = (p.pid, p.info['create_time'])
+                try:
+                    cpu = self.pool.get(key, p).cpu_percent(None)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    cpu = 0.0
+                memory = p.info['memory_info']
+                yield (p.pid, p.info['create_time'], p.info['status'], p.info['ppid'] or 0, cpu,
+                       memory.rss if memory else 0, p.info['name'], p)
+
+    def _read_stats(self):
+        """
+        Read /proc/<pid>/stat of every process, in worker processes when self.scanners is set.
+
+        :return: Generator of tuples (pid, name, status, ppid, start, ticks, rss, now), in pid order.
+        """
+        reader = self._proc_reader
+        pids = self._scan_pids()
+        if self.scanners is not None:
+            for shard in self.scanners.map_shards(partial(scan_stat, reader.proc_path), array('i', pids)):
+                yield from decode_stat(shard)
+            return
+        for pid in pids:
+            try:
+                name, status, ppid, start, ticks, rss = reader.read_stat(pid)
+            except (FileNotFoundError, ProcessLookupError, ValueError):
+                continue
+            yield pid, name, status, ppid, start, ticks, rss, time.monotonic()
+
+    def _scan_pids(self):
+        """
+        List the pids to scan.
+
+        With process events, that is the known processes plus those the events name, so /proc
+        is only listed in full on the first scan or after events were lost. Exited processes
+        are dropped by the scan itself, once their stat can no longer be read.
+
+        :return: Sorted list of pids.
+        """
+        self._events = []
+        if self.connector is None:
+            return self._proc_reader.pids()
+        self._events, lost = self.connector.drain()
+        if self.connector.dead:
+            # the event source failed, poll from now on
+            self._set_connector(False)
+            return self._proc_reader.pids()
+        if lost or not len(self._current):
+            return self._proc_reader.pids()
+        pids = set(self._current.pid)
+        pids.update(event.pid for event in self._events if event.kind != 'exit')
+        return sorted(pids)
+
+    def _read_static(self, key, handle, columns, cached: dict, reader: ProcReader):
+        """
+        Full read of the fields that do not change for a given process identity.
+
+        Leaves the shared caches alone so shards can run it on any thread.
+
+        :param columns: Which of 'username' and 'exe' to read; the others are returned as PENDING.
+        :param cached: Attributes of the identity already in self.identities, reused instead of read.
+        :param reader: ProcReader owned by the calling thread.
+        :return: Tuple (name, uid, exe).
+        """
+        pid = key[0]
+        uid = exe = PENDING
+        if self.backend == 'procfs':
+            name = cached['name'] if 'name' in cached else reader.full_name(pid, handle)
+            if 'username' in columns:
+                uid = reader.read_uid(pid)
+            if 'exe' in columns:
+                exe = cached['exe'] if 'exe' in cached else reader.read_exe(pid)
+        else:
+            attrs = [attr for attr in ('name', 'exe') if attr not in cached and (attr == 'name' or attr in columns)]
+            if 'username' in columns:
+                attrs.append('uids')
+            # as_dict() with no attrs would read every attribute
+            info = handle.as_dict(attrs=attrs) if attrs else {}
+            name = cached.get('name', info.get('name'))
+            if 'exe' in columns:
+                exe = cached.get('exe', info.get('exe'))
+            if 'username' in columns:
+                uid = info['uids'].real if info['uids'] else None
+        return name, uid, exe
+
+    def _remember(self, key, name, exe):
+        self.identities.update(key, name=name)
+        if exe is not PENDING:
+            self.identities.update(key, exe=exe)
+
+    def _read_many(self, items: list) -> list:
+        """
+        Full read of many processes, sharded across self.shards.
+
+        Name and exe come from self.identities when another path already read them.
+
+        :param items: List of (key, handle, columns).
+        :return: List of (name, uid, exe) in the order of items, None for processes that exited.
+        """
+        cached = [self.identities.lookup(key) for key, _, _ in items]
+
+        def read_shard(shard):
+            # ProcReader reuses one buffer, so every shard needs its own
+            reader = ProcReader(self._proc_reader.proc_path, users=self.users)
+            results = []
+            for (key, handle, columns), entry in shard:
+                try:
+                    results.append(self._read_static(key, handle, columns, entry, reader))
+                except (psutil.NoSuchProcess, FileNotFoundError, ProcessLookupError, ValueError):
+                    results.append(None)
+            return results
+
+        results = self.shards.map(read_shard, list(zip(items, cached)))
+        for (key, _, _), result in zip(items, results):
+            if result is not None:
+                self._remember(key, result[0], result[2])
+        return results
+
+    def load_columns(self, pids):
+        """
+        Read the lazy columns of some processes, e.g. the rows visible in the process view.
+
+        The values are filled in the current snapshot in place.
+
+        :param pids: Iterable of process IDs.
+        :return: List of the updated (pid, name, status, username, exe) rows.
+        """
+        snap = self._current
+        items = []
+        for pid in pids:
+            index = snap.index_of(pid)
+            if index is None:
+                continue
+            row = snap[index]
+            columns = [column for column, value in zip(('username', 'exe'), row[3:]) if value is PENDING]
+            if columns:
+                key = snap.key(index)
+                items.append((key, row[1] if self.backend == 'procfs' else self.pool.get(key), columns))
+        updated = []
+        for (key, _, _), result in zip(items, self._read_many(items)):
+            index = snap.find(*key)
+            if result is None or index is None:
+                continue
+            _, uid, exe = result
+            self._store(snap, index, uid=uid, exe=exe)
+            updated.append(snap[index])
+        return updated
+
+    def _store(self, snap: ProcessSnapshot, index: int, name=PENDING, uid=PENDING, exe=PENDING):
+        """Write the read attributes of a row into a snapshot; PENDING arguments are left alone."""
+        pools, codes = snap.pools, snap.codes
+        if name is not PENDING:
+            codes['name'][index] = pools['name'].add(name)
+        if uid is not PENDING:
+            snap.uid[index] = UID_NONE if uid is None else uid
+            codes['username'][index] = pools['username'].add(self.users.name(uid))
+        if exe is not PENDING:
+            codes['exe'][index] = pools['exe'].add(exe)
+
+    def _identity(self, pid: int, process: psutil.Process):
+        """
+        Get the (pid, create_time) key of a process in the units of the current backend.
+
+        :param pid: Process ID.
+        :param process: psutil handle of the same process.
+        """
+        if self.backend == 'procfs':
+            return pid, self._proc_reader.read_stat(pid)[3]
+        return pid, process.create_time()
+
+    def _collect(self):
+        """
+        Build the next snapshot from the previous one: new processes get a full read, surviving
+        ones only have their status, CPU and memory refreshed, and exited ones are dropped.
+
+        The snapshot is the only per-process state kept between scans. It shares the string
+        pools of the previous one, so surviving processes keep their codes instead of having
+        every value interned again.
+        """
+        previous = self._current
+        eager = [column for column in self.LAZY_COLUMNS if column not in self.lazy_columns]
+        # user names are only re-resolved for known processes when passwd changed
+        users_changed = self.users.check()
+
+        scanned = list(self._scan())
+        # row of every scanned process in the previous snapshot, -1 for new processes
+        positions = dict(zip(previous.pid, range(len(previous))))
+        sources = []
+        for pid, create_time, *_ in scanned:
+            index = positions.get(pid, -1)
+            sources.append(index if index >= 0 and previous.start[index] == create_time else -1)
+        # known processes that exec'd or were renamed get a full read again
+        stale = set()
+        for event in self._events:
+            if event.kind in ('exec', 'comm'):
+                if event.start is not None:
+                    index = previous.find(event.pid, event.start)
+                else:
+                    index = previous.index_of(event.pid)
+                if index is not None:
+                    stale.add(index)
+        # exec keeps the identity, so without events it only shows as a new command name
+        names, name_codes = previous.pools['name'].values, previous.codes['name']
+        for row, index in zip(scanned, sources):
+            if index >= 0 and index not in stale and not comm_matches(row[6], names[name_codes[index]]):
+                stale.add(index)
+        for index in stale:
+            self.identities.discard(previous.key(index))
+        reads = [position for position, index in enumerate(sources) if index < 0 or index in stale]
+        items = []
+        for position in reads:
+            key, handle = (scanned[position][0], scanned[position][1]), scanned[position][-1]
+            if self.backend == 'psutil' and sources[position] in stale:
+                handle = self.pool.replace(key)
+            items.append((key, handle, eager))
+        static = {}
+        for position, result in zip(reads, self._read_many(items)):
+            static[scanned[position][0]] = result
+        if None in static.values():
+            # drop the processes that exited before their full read
+            kept = [position for position, row in enumerate(scanned) if static.get(row[0], True) is not None]
+            scanned = [scanned[position] for position in kept]
+            sources = [sources[position] for position in kept]
+
+        snap = ProcessSnapshot(previous.pools)
+        snap.pid = array('i', [row[0] for row in scanned])
+        snap.start = array('d', [row[1] for row in scanned])
+        snap.ppid = array('i', [row[3] for row in scanned])
+        snap.cpu = array('d', [row[4] for row in scanned])
+        snap.rss = array('Q', [row[5] for row in scanned])
+        status_pool = snap.pools['status']
+        snap.codes['status'] = array('I', [status_pool.add(row[2]) for row in scanned])
+        for column in ('name', 'username', 'exe'):
+            codes = previous.codes[column]
+            snap.codes[column] = array('I', [codes[index] if index >= 0 else 0 for index in sources])
+        uids = previous.uid
+        snap.uid = array('q', [uids[index] if index >= 0 else UID_PENDING for index in sources])
+
+        delta = SnapshotDelta()
+        added, changed = [], set()
+        for position, (row, index) in enumerate(zip(scanned, sources)):
+            result = static.get(row[0])
+            if result is not None:
+                name, uid, exe = result
+                self._store(snap, position, name, uid, exe)
+                if uid is PENDING:
+                    snap.uid[position] = UID_PENDING
+                    snap.codes['username'][position] = snap.pools['username'].add(PENDING)
+                if exe is PENDING:
+                    snap.codes['exe'][position] = snap.pools['exe'].add(PENDING)
+                if index < 0:
+                    added.append(position)
+                elif snap[position] != previous[index]:
+                    changed.add(position)
+        old_status, new_status = previous.codes['status'], snap.codes['status']
+        changed.update(position for position, index in enumerate(sources)
+                       if index >= 0 and old_status[index] != new_status[position])
+        if users_changed:
+            for position, uid in enumerate(snap.uid):
+                if uid >= 0:
+                    code = snap.pools['username'].add(self.users.name(uid))
+                    if code != snap.codes['username'][position]:
+                        snap.codes['username'][position] = code
+                        changed.add(position)
+        self._revalidate(snap, changed)
+
+        survivors = set(sources)
+        for index in range(len(previous)):
+            if index not in survivors:
+                delta.removed.append(previous[index])
+                self.identities.discard(previous.key(index))
+        delta.added = [snap[position] for position in added]
+        delta.changed = [snap[position] for position in sorted(changed)]
+        delta.transient = self._transient(previous, snap)
+        if len(self.pool):
+            self.pool.retain(set(zip(snap.pid, snap.start)))
+        if max(len(pool) for pool in snap.pools.values()) > 2 * len(snap) + 1024:
+            # values of exited processes piled up in the shared pools
+            snap.repool()
+        self._current = snap
+        self.last_delta = delta
+        self._generation += 1
+        snap.generation, snap.delta = self._generation, delta
+        snap.shard_seconds = self.shards.shard_seconds
+        return snap
+
+    def _transient(self, previous: ProcessSnapshot, current: ProcessSnapshot) -> list:
+        """
+        Rows of the processes the events of this scan saw start and exit, but no scan saw at all.
+
+        :param previous: The previous snapshot.
+        :param current: The snapshot being built.
+        """
+        births, rows = {}, []
+        for event in self._events:
+            if event.kind == 'fork':
+                births[event.pid] = {'start': event.start, 'name': event.name, 'uid': event.uid, 'exe': PENDING}
+            elif event.pid in births and event.kind in ('exec', 'comm'):
+                birth = births[event.pid]
+                birth.update(name=event.name or birth['name'], uid=event.uid if event.uid is not None else birth['uid'])
+                if event.kind == 'exec':
+                    birth['exe'] = event.exe
+            elif event.kind == 'exit' and event.pid in births:
+                birth = births.pop(event.pid)
+                if previous.find(event.pid, birth['start']) is None and current.find(event.pid, birth['start']) is None:
+                    rows.append((event.pid, birth['name'], 'dead', self.users.name(birth['uid']), birth['exe']))
+        return rows
+
+    def _revalidate(self, snap: ProcessSnapshot, changed: set):
+        """
+        Re-read the slow-changing attributes the AttributeScheduler planned for this refresh.
+
+        :param snap: The snapshot being built, updated in place.
+        :param changed: Row indexes of changed rows, updated in place.
+        """
+        plan = self.attributes.plan(range(len(snap)), time.monotonic())
+        for attr, indexes in plan.items():
+            codes, pool = snap.codes[attr], snap.pools[attr]
+            for index in indexes:
+                if pool[codes[index]] is PENDING:
+                    # not loaded yet, nothing to re-validate
+                    continue
+                key = snap.key(index)
+                try:
+                    if attr == 'username':
+                        uid = self._read_uid(key)
+                        if uid == snap.uid[index]:
+                            continue
+                        snap.uid[index] = uid
+                        value = self.users.name(uid)
+                    else:
+                        value = self._read_exe(key)
+                        self.identities.update(key, exe=value)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, FileNotFoundError, ProcessLookupError, ValueError):
+                    continue
+                code = pool.add(value)
+                if code != codes[index]:
+                    codes[index] = code
+                    changed.add(index)
+
+    def _read_uid(self, key):
+        """Read the real UID of a known process, bypassing every cache."""
+        if self.backend == 'procfs':
+            return self._proc_reader.read_uid(key[0])
+        return self.pool.get(key).uids().real
+
+    def _read_exe(self, key):
+        """Read the executable of a known process, bypassing every cache."""
+        if self.backend == 'procfs':
+            return self._proc_reader.read_exe(key[0])
+        try:
+            return self.pool.get(key).exe()
+        except psutil.AccessDenied:
+            return None
+
+    def close(self):
+        """Stop the threads and processes of parallel collection and the process event source."""
+        self.shards.close()
+        if self.scanners is not None:
+            self.scanners.close()
+        self._set_connector(False)
 
     def get_all_processes(self):
         """
         Retrieve a list of all processes with attributes defined in self.params.
 
-        :return: List of tuples representing processes with (pid, name, status, username, exe).
+        :return: ProcessSnapshot of all processes with (pid, name, status, username, exe) rows.
         """
-        # ps = [p.info for p in psutil.process_iter(attrs=self.params)]
-        return [
-            (p.info['pid'], p.info['name'], p.info['status'], p.info['username'], p.info['exe'])
-            for p in psutil.process_iter(attrs=['pid', 'name', 'status', 'username', 'exe'])
-        ]
+        return self.snapshot()
 
     def get_process_by_name(self, name: str):
         """
         Retrieve processes matching a specific name.
 
         :param name: The name (or part of it) of the process to search for.
-        :return: List of tuples representing processes or an empty list if none found.
+        :return: ProcessSnapshot of the matching processes or False if none found.
         """
-        ps = [p.info for p in psutil.process_iter(attrs=self.params) if name in p.info['name']]
-        if len(ps) == 0:
-            return False
-        else:
-            rows = [(p['pid'], p['name'], p['status'], p['username'], p['exe']) for p in ps]
-        return rows
+        snap = self.snapshot()
+        rows = snap.select(snap.where('name', lambda value: value and value is not PENDING and name in value))
+        return rows or False
 
     def get_process_by_user(self, username: str):
         """
         Retrieve processes owned by a specific user.
 
         :param username: The username of the process owner.
-        :return: List of tuples representing processes or an empty list if none found.
+        :return: ProcessSnapshot of the matching processes or False if none found.
         """
-        ps = [p.info for p in psutil.process_iter(attrs=self.params) if username in p.info['username']]
-        if len(ps) == 0:
-            return False
-        else:
-            rows = [(p['pid'], p['name'], p['status'], p['username'], p['exe']) for p in ps]
-        return rows
+        snap = self.snapshot()
+        rows = snap.select(snap.where('username', lambda value: value and value is not PENDING and username in value))
+        return rows or False
+
+    def get_process_tree(self):
+        """
+        Get the parent/child index of the current snapshot, with CPU and RSS totals per subtree.
+
+        :return: ProcessTree; built once per snapshot.
+        """
+        return self.snapshot().tree()
+
+    def socket_index(self, force: bool = False):
+        """
+        Return the socket inode -> pid index, rebuilding it only when it is older than self.ttl.
+
+        :param force: Rebuild even if the index is still fresh.
+        :return: SocketIndex shared by all connection queries.
+        """
+        now = time.monotonic()
+        if force or self._sockets_time is None or now - self._sockets_time >= self.ttl:
+            self.sockets.build()
+            self._sockets_time = time.monotonic()
+        return self.sockets
+
+    @staticmethod
+    def _connection_row(conn):
+        return [
+            conn.fd,
+            repr(conn.family),
+            repr(conn.type),
+            f"{conn.laddr.ip}:{conn.laddr.port}",
+            f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "N/A",
+            conn.status,
+        ]
 
     def get_process_connections(self, pid):
         """
@@ -58,36 +697,91 @@ class ProcessManager:
         Args:
             pid (int): Process ID.
         Returns:
-            list: A list where the first element is the headers,
-                  followed by rows of connection details.
+            list: Rows of connection details (fd, family, type, local address, remote address, status).
                   Returns an empty list if no connections are found.
         """
-        try:
-            process = psutil.Process(pid)
-            conns = process.connections()
-
-            if conns:
-                # Extract headers and data
-                return [
-                    [
-                        conn.fd,
-                        repr(conn.family),
-                        repr(conn.type),
-                        f"{conn.laddr.ip}:{conn.laddr.port}",
-                        f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "N/A",
-                        conn.status,
-                    ]
-                    for conn in conns
-                ]
-            else:
-                return []
+        return [self._connection_row(conn) for conn in self.socket_index().connections(pid)]
 
-        except psutil.NoSuchProcess:
-            print(f"No process found with PID {pid}.")
-            return []
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            return []
+    def get_port_owners(self, port: int):
+        """
+        Find the processes holding sockets bound to a local port.
+
+        :param port: Local port number.
+        :return: List of rows (pid, fd, family, type, local address, remote address, status).
+        """
+        return [[pid] + self._connection_row(conn) for pid, conn in self.socket_index().port_owners(port)]
+
+    def fetch_details(self, pids):
+        """
+        Retrieve details for several processes in one call, e.g. for a multi-selection or a prefetch.
+
+        :param pids: Iterable of process IDs.
+        :return: List of ProcessDetails in the order of pids; processes that exited are skipped.
+        """
+        total_memory = psutil.virtual_memory().total
+        details = []
+        for pid in pids:
+            try:
+                details.append(self._fetch_details(pid, total_memory))
+            except psutil.NoSuchProcess:
+                continue
+        return details
+
+    def _fetch_details(self, pid: int, total_memory: int):
+        """
+        Read the details of one process with as few /proc reads as possible.
+
+        oneshot() makes stat/status-backed attributes share a single read, name, cmdline and
+        exe come from the identity cache unless the name shows the process exec'd, and memory
+        percent uses the caller's total memory.
+        Subtree totals come from the process tree of the last snapshot when the process is in it.
+
+        :return: ProcessDetails; only pid is set and denied is True when access is denied.
+        """
+        process = psutil.Process(pid)
+        try:
+            # procfs reads the identity from /proc, which vanishes when the process exits
+            key = self._identity(pid, process)
+            # the pooled handle keeps the previous CPU sample
+            process = self.pool.get(key, process)
+            cached = self.identities.lookup(key)
+            if 'name' in cached and not comm_matches(process.name(), cached['name']):
+                # the process exec'd since it was cached; the handle caches exe as well
+                self.identities.discard(key)
+                process, cached = self.pool.replace(key), {}
+            with process.oneshot():
+                reads = {'name': process.name, 'cmdline': process.cmdline, 'exe': process.exe}
+                if self.backend == 'procfs':
+                    reads['cmdline'] = partial(self._proc_reader.read_cmdline, pid)
+                missing = {attr: read() for attr, read in reads.items() if attr not in cached}
+                if missing:
+                    self.identities.update(key, **missing)
+                    cached = self.identities.lookup(key)
+                # CPU and subtree totals come from the last scan when it saw this process
+                snap = self._current
+                index = snap.find(*key)
+                subtree = snap.tree().totals(pid) if index is not None else None
+                return ProcessDetails(
+                    pid=pid,
+                    created=process.create_time(),
+                    name=cached['name'],
+                    ppid=process.ppid(),
+                    status=process.status(),
+                    username=process.username(),
+                    cpu_percent=snap.cpu[index] if index is not None else process.cpu_percent(None),
+                    memory_percent=process.memory_info().rss / total_memory * 100,
+                    subtree_processes=subtree[0] if subtree else None,
+                    subtree_cpu_percent=subtree[1] if subtree else None,
+                    subtree_memory_percent=subtree[2] / total_memory * 100 if subtree else None,
+                    cmdline=cached['cmdline'],
+                    cwd=process.cwd(),
+                    exe=cached['exe'],
+                    has_connections=self._proc_reader.has_socket(pid),
+                )
+        except (psutil.AccessDenied, PermissionError):
+            return ProcessDetails(pid=pid, denied=True)
+        except FileNotFoundError:
+            raise psutil.NoSuchProcess(pid)
 
     def get_process_details(self, pid: int):
         """
@@ -96,57 +790,23 @@ class ProcessManager:
         :param pid: The process ID (PID) to retrieve details for.
         :return: Dictionary of process details or "Permission Error" if access is denied.
         """
-        try:
-            process = psutil.Process(pid)
-            return {
-                'Created': datetime.fromtimestamp(process.create_time()).strftime('%Y-%m-%d %H:%M'),
-                'Name': process.name(),
-                'PID': pid,
-                'Parent': process.ppid(),
-                'Status': process.status(),
-                'Owner': process.username(),
-                'CPU Percent': process.cpu_percent(),
-                'Mem Percent': process.memory_percent(),
-                #
-                'CMDLine': '\n'.join(process.cmdline()),
-                'CWD': process.cwd(),
-                'Executable': process.exe(),
-                'Connections': 'Has Connections' if len(process.net_connections()) > 0 else 'No Connections',
-            }
-        except psutil.AccessDenied:
+        details = self._fetch_details(pid, psutil.virtual_memory().total)
+        if details.denied:
             return "Permission Error"
+        return details.as_dict()
 
 
 # ==========================================================================================
-def get_column_value(table: QtWidgets.QTableWidget, column: int) -> str:
+def get_column_value(table: QtWidgets.QTableView, column: int) -> str:
     """
-    Get the value from a specific column of the selected row in a QTableWidget.
+    Get the value from a specific column of the selected row in a QTableView.
 
-    :param table: The QTableWidget instance.
+    :param table: The QTableView instance.
     :param column: The column index to retrieve the value from.
     :return: The value as a string.
     """
-    row = table.currentRow()
-    return table.item(row, column).text()
-
-
-def display_table_records(table: QtWidgets.QTableWidget, rows: list, headers: list):
-    """
-    Populate a QTableWidget with rows and headers.
-
-    :param table: The QTableWidget instance.
-    :param rows: A list of rows where each row is a list or tuple of values.
-    :param headers: A list of column headers.
-    """
-    table.clear()
-    table.setColumnCount(len(headers))
-    table.setRowCount(len(rows))
-    table.setHorizontalHeaderLabels(headers)
-
-    for row_idx, row_data in enumerate(rows):
-        for col_idx, value in enumerate(row_data):
-            item = QtWidgets.QTableWidgetItem(str(value))
-            table.setItem(row_idx, col_idx, item)
+    row = table.currentIndex().row()
+    return table.model().index(row, column).data()
 
 
 def populate_comboBox(combobox: QtWidgets.QComboBox, items: list):
@@ -164,8 +824,29 @@ def populate_comboBox(combobox: QtWidgets.QComboBox, items: list):
 
 if __name__ == '__main__':
     pm = ProcessManager()
-    # print(pm.get_all_processes())
+    for backend in ProcessManager.BACKENDS:
+        pm.set_backend(backend)
+        start = time.perf_counter()
+        rows = pm.snapshot()
+        print(f"{backend}: {len(rows)} processes in {(time.perf_counter() - start) * 1000:.1f} ms")
+    # steady-state refreshes of the procfs backend, in this process and sharded across worker processes
+    for processes in (0, None):
+        manager = ProcessManager(backend='procfs', processes=processes)
+        manager.snapshot()
+        start = time.perf_counter()
+        for _ in range(10):
+            manager.refresh()
+        if processes == 0:
+            label = 'in-process'
+        elif len(manager.scanners.shard_seconds) > 1:
+            label = f"{len(manager.scanners.shard_seconds)} worker process shards"
+        else:
+            # map_shards() stays in this process when there are too few processes to shard
+            label = 'in-process, too few processes to shard'
+        print(f"procfs refresh, {label}: {(time.perf_counter() - start) * 100:.1f} ms")
+        manager.close()
+    # print(list(pm.get_all_processes()))
     # print(pm.get_process_details(1))
-    # print(pm.get_process_by_name('python'))
+    # print(list(pm.get_process_by_name('python') or []))
     # print(pm.get_process_details(pid=28472,))
-    print(pm.get_process_by_user('root'))
+    print(list(pm.get_process_by_user('root') or []))
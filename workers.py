@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from PyQt5 import QtCore
+
+
+class ProcessCollector(QtCore.QObject):
+    """
+    Run ProcessManager queries on a worker thread so /proc I/O never blocks the GUI.
+
+    Requests are queued with submit() and answered through the finished signal, which
+    carries the callback given to submit() and the query result.
+    """
+
+    finished = QtCore.pyqtSignal(object, object)
+    _submitted = QtCore.pyqtSignal(object, str, tuple)
+
+    def __init__(self, process_manager):
+        """
+        :param process_manager: The ProcessManager to query; only touched from the worker thread.
+        """
+        super().__init__()
+        self.process_manager = process_manager
+        self._thread = QtCore.QThread()
+        self.moveToThread(self._thread)
+        self._submitted.connect(self._run)
+        self._thread.start()
+
+    def submit(self, callback, method: str, *args):
+        """
+        Queue a ProcessManager call on the worker thread.
+
+        :param callback: Passed back through finished together with the result.
+        :param method: Name of the ProcessManager method to call.
+        :param args: Positional arguments for the method.
+        """
+        self._submitted.emit(callback, method, args)
+
+    @QtCore.pyqtSlot(object, str, tuple)
+    def _run(self, callback, method, args):
+        try:
+            result = getattr(self.process_manager, method)(*args)
+        except Exception as e:
+            print(f"An error occurred in {method}: {e}")
+            return
+        self.finished.emit(callback, result)
+
+    def stop(self):
+        """Stop the worker thread, waiting for the running query to finish."""
+        self._thread.quit()
+        self._thread.wait()
+
+
+class AsyncProcessCollector:
+    """
+    asyncio counterpart of ProcessCollector, for embedding ProcessManager in an event loop.
+
+    ProcessManager keeps caches that are not thread-safe, so calls run one at a time on a
+    single executor thread, in submission order. At most max_pending calls are queued or
+    running; further callers wait without blocking the loop. updates() lets any number of
+    consumers share one refresh loop.
+    """
+
+    def __init__(self, process_manager, max_pending: int = 64, interval: float = None,
+                 scheduler: 'RefreshScheduler' = None):
+        """
+        :param process_manager: The ProcessManager to query; only touched from the executor thread.
+        :param max_pending: Most calls queued or running at once.
+        :param interval: Fixed delay between refreshes of updates(); None adapts it with scheduler.
+        :param scheduler: RefreshScheduler used when interval is None.
+        """
+        self.process_manager = process_manager
+        self.max_pending = max_pending
+        self.interval = interval
+        self.scheduler = scheduler if scheduler is not None else RefreshScheduler()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='collector')
+        # created on first use so they bind to the running loop
+        self._pending = None
+        self._loop = None
+        self._task = None
+        self._subscribers = set()
+        process_manager.snapshot_listeners.append(self._on_snapshot)
+
+    async def call(self, method: str, *args):
+        """
+        Run a ProcessManager method on the executor thread.
+
+        :param method: Name of the ProcessManager method to call.
+        :param args: Positional arguments for the method.
+        :return: What the method returned.
+        """
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(getattr(self.process_manager, method), *args))
+
+    async def get_all_processes(self):
+        """Async ProcessManager.get_all_processes()."""
+        return await self.call('get_all_processes')
+
+    async def get_process_details(self, pid: int):
+        """Async ProcessManager.get_process_details()."""
+        return await self.call('get_process_details', pid)
+
+    async def get_process_connections(self, pid: int):
+        """Async ProcessManager.get_process_connections()."""
+        return await self.call('get_process_connections', pid)
+
+    async def updates(self):
+        """
+        Iterate over new snapshots as they are taken.
+
+        The first consumer starts a refresh loop, which stops once the last one is gone.
+        Snapshots taken by other calls, e.g. get_all_processes(), are delivered too, so
+        every snapshot's delta applies to the one yielded before it. The first snapshot a
+        consumer gets should be taken in full, as its delta is against an earlier one.
+
+        :return: Async iterator of ProcessSnapshot; each one's delta holds the changes.
+        """
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._refresh_loop())
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _refresh_loop(self):
+        try:
+            while self._subscribers:
+                snapshot = await self.call('snapshot', True)
+                if self.interval is not None:
+                    delay = self.interval
+                else:
+                    churn = len(snapshot.delta.added) + len(snapshot.delta.removed)
+                    delay = self.scheduler.next_interval(snapshot.scan_cpu_seconds, churn, len(snapshot))
+                await asyncio.sleep(delay)
+        finally:
+            self._task = None
+
+    def _on_snapshot(self, snapshot):
+        # runs on the executor thread
+        if self._subscribers:
+            self._loop.call_soon_threadsafe(self._publish, snapshot)
+
+    def _publish(self, snapshot):
+        for queue in self._subscribers:
+            queue.put_nowait(snapshot)
+
+    def close(self):
+        """Stop the refresh loop and the executor thread, waiting for the running call to finish."""
+        if self._task is not None:
+            self._task.cancel()
+        self._subscribers.clear()
+        self.process_manager.snapshot_listeners.remove(self._on_snapshot)
+        self._executor.shutdown()
+
+
+class RefreshScheduler:
+    """
+    Choose the delay until the next process refresh from what the last scans cost and found.
+
+    The interval backs off when scans are expensive or nothing starts or exits, and
+    tightens when processes churn. It never drops below what keeps the monitor's own scan
+    CPU time within cpu_budget (a fraction of one core).
+    """
+
+    def __init__(self, min_interval: float = 0.5, max_interval: float = 10.0, cpu_budget: float = 0.05,
+                 churn_threshold: float = 0.01):
+        """
+        :param min_interval: Shortest delay between refreshes, in seconds.
+        :param max_interval: Longest delay between refreshes, in seconds.
+        :param cpu_budget: Share of one core the scans may use, e.g. 0.05 for 5%.
+        :param churn_threshold: Share of processes started or exited per refresh above which
+            the interval is shortened.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.churn_threshold = churn_threshold
+        self.interval = min_interval
+
+    def next_interval(self, scan_cpu_seconds: float, churn: int, total: int) -> float:
+        """
+        Record the outcome of a refresh and get the delay until the next one.
+
+        :param scan_cpu_seconds: CPU time the scan took.
+        :param churn: Number of processes that started or exited since the previous scan.
+        :param total: Number of processes in the snapshot.
+        :return: Delay in seconds.
+        """
+        if churn == 0:
+            self.interval *= 1.5
+        elif churn >= max(1, total * self.churn_threshold):
+            self.interval *= 0.5
+        floor = max(self.min_interval, (scan_cpu_seconds or 0.0) / self.cpu_budget)
+        self.interval = min(max(self.interval, floor), max(self.max_interval, floor))
+        return self.interval
+
+
+@dataclass
+class AttributePolicy:
+    """How often a slow-changing process attribute is re-read for processes already known."""
+    name: str
+    # syscalls one read costs, e.g. 3 to open, read and close a file, 1 for a readlink
+    cost: int
+    # seconds a value may go without being re-read
+    max_age: float
+
+
+class AttributeScheduler:
+    """
+    Spread the periodic re-reads of slow-changing attributes across refreshes.
+
+    Each refresh re-reads a round-robin slice of the processes per attribute, sized so the
+    whole list is covered once every max_age seconds. When that would cost more than
+    max_syscalls, every attribute's slice is scaled down by the same factor and the
+    deferred work carries over to the next refresh.
+    """
+
+    def __init__(self, policies, max_syscalls: int = 256):
+        """
+        :param policies: Iterable of AttributePolicy.
+        :param max_syscalls: Most syscalls spent on re-reads per refresh.
+        """
+        self.policies = list(policies)
+        self.max_syscalls = max_syscalls
+        self._cursor = {policy.name: 0 for policy in self.policies}
+        self._credit = {policy.name: 0.0 for policy in self.policies}
+        self._last = None
+
+    def plan(self, keys: list, now: float) -> dict:
+        """
+        Pick what to re-read during this refresh.
+
+        :param keys: Identities or row indexes of the processes currently known, in a stable order.
+        :param now: Current monotonic time.
+        :return: Mapping of attribute name to the list of keys to re-read.
+        """
+        elapsed = 0.0 if self._last is None else now - self._last
+        self._last = now
+        plan = {}
+        if not keys:
+            return plan
+        wanted = {
+            policy.name: min(len(keys), self._credit[policy.name] + len(keys) * elapsed / policy.max_age)
+            for policy in self.policies
+        }
+        cost = sum(int(wanted[policy.name]) * policy.cost for policy in self.policies)
+        scale = min(1.0, self.max_syscalls / cost) if cost else 1.0
+        for policy in self.policies:
+            count = int(int(wanted[policy.name]) * scale)
+            self._credit[policy.name] = wanted[policy.name] - count
+            if not count:
+                continue
+            start = self._cursor[policy.name] % len(keys)
+            plan[policy.name] = [keys[(start + i) % len(keys)] for i in range(count)]
+            self._cursor[policy.name] = start + count
+        return plan
+
+
+class ShardPool:
+    """
+    Run a function over contiguous shards of a list on a bounded thread or process pool.
+
+    Threads suit blocking per-process reads (readlink, NSS lookups) that release the GIL;
+    processes suit CPU-bound parsing, given a module-level function whose shards and
+    results pickle compactly (arrays and bytes rather than lists of tuples). Small inputs,
+    and hosts with a single core, are processed serially on the calling thread.
+    """
+
+    def __init__(self, workers: int = None, min_shard: int = 32, processes: bool = False):
+        """
+        :param workers: Most threads or processes used; None sizes it from the CPU count, 1 always runs serially.
+        :param min_shard: Fewest items per shard, so tiny inputs are not split.
+        :param processes: Use worker processes instead of threads.
+        """
+        self.workers = workers if workers is not None else min(8, os.cpu_count() or 1)
+        self.min_shard = min_shard
+        self.processes = processes
+        # wall-clock seconds each shard of the last map() took
+        self.shard_seconds = []
+        # running total of the CPU seconds shards spent on other threads or processes,
+        # which the caller's own thread_time() does not see
+        self.offloaded_cpu_seconds = 0.0
+        self._executor = None
+
+    def map(self, fn, items: list) -> list:
+        """
+        Apply fn to shards of items and concatenate the results in item order.
+
+        :param fn: Callable taking a list of items and returning a list of results of the same length.
+        :param items: Items to process.
+        :return: List of results.
+        """
+        results = []
+        for shard in self.map_shards(fn, items):
+            results.extend(shard)
+        return results
+
+    def map_shards(self, fn, items) -> list:
+        """
+        Apply fn to shards of items.
+
+        :param fn: Callable taking a slice of items; must be picklable in process mode.
+        :param items: A list, or an array to ship shards to worker processes as raw bytes.
+        :return: List of what fn returned for each shard, in item order.
+        """
+        count = min(self.workers, len(items) // self.min_shard)
+        if count <= 1:
+            result, seconds, _ = _timed(fn, items)
+            self.shard_seconds = [seconds]
+            return [result]
+        if self._executor is None:
+            if self.processes:
+                # fork is unsafe in a process that already runs threads (Qt, the collector)
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='shard')
+        size = -(-len(items) // count)
+        futures = [self._executor.submit(_timed, fn, items[i:i + size]) for i in range(0, len(items), size)]
+        results, self.shard_seconds = [], []
+        for future in futures:
+            result, seconds, cpu_seconds = future.result()
+            results.append(result)
+            self.shard_seconds.append(seconds)
+            self.offloaded_cpu_seconds += cpu_seconds
+        return results
+
+    def close(self):
+        """Shut the workers down; a later map() starts them again."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _timed(fn, items):
+    """Run fn on items; return its result, the wall-clock seconds and the thread's CPU seconds it took."""
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    result = fn(items)
+    return result, time.perf_counter() - start, time.thread_time() - cpu_start